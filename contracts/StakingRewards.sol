@@ -11,6 +11,16 @@ import "./interfaces/IStakingRewards.sol";
 import "./RewardsDistributionRecipient.sol";
 import "./Pausable.sol";
 
+interface IVaultPermit {
+    function permit(
+        address owner,
+        address spender,
+        uint256 amount,
+        uint256 expiry,
+        bytes calldata signature
+    ) external returns (bool);
+}
+
 // https://docs.synthetix.io/contracts/source/contracts/stakingrewards
 contract StakingRewards is
     IStakingRewards,
@@ -53,6 +63,21 @@ contract StakingRewards is
     /// @dev Can only be performed at least 90 days after final reward period ends.
     bool public isRetired;
 
+    /// @notice Pool our stakers are being moved to, staking here is closed once this is set.
+    address public migrationTarget;
+
+    /// @notice How long stakers have to exit after a migration is announced.
+    uint256 public constant MIGRATION_DELAY = 7 days;
+
+    /// @notice Timestamp from which migrate() may be called.
+    uint256 public migrationStart;
+
+    /// @notice Address allowed to move stakers to migrationTarget in batches.
+    address public migrator;
+
+    /// @notice Pool allowed to move its stakers into this one.
+    address public migrationSource;
+
     /// @notice The amount of rewards allocated to a user per whole token staked.
     /// @dev Note that this is not the same as amount of rewards claimed.
     mapping(address => uint256) public userRewardPerTokenPaid;
@@ -145,8 +170,39 @@ contract StakingRewards is
         notPaused
         updateReward(msg.sender)
     {
+        _stake(amount);
+    }
+
+    /// @notice Deposit vault tokens to the staking pool, using a signed permit instead of approve.
+    /// @dev Can't stake zero. Staking token must be a yearn vault (or share its permit()).
+    ///  Permit is skipped if allowance is already high enough, so a front-run permit can't block us.
+    /// @param amount Amount of vault tokens to deposit.
+    /// @param deadline Expiry timestamp of the permit signature.
+    /// @param signature Owner's EIP-2612 signature, packed as r, s, v.
+    function stakeWithPermit(
+        uint256 amount,
+        uint256 deadline,
+        bytes calldata signature
+    ) external nonReentrant notPaused updateReward(msg.sender) {
+        if (stakingToken.allowance(msg.sender, address(this)) < amount) {
+            require(
+                IVaultPermit(address(stakingToken)).permit(
+                    msg.sender,
+                    address(this),
+                    amount,
+                    deadline,
+                    signature
+                ),
+                "permit failed"
+            );
+        }
+        _stake(amount);
+    }
+
+    function _stake(uint256 amount) internal {
         require(amount > 0, "Cannot stake 0");
         require(!isRetired, "Staking pool is retired");
+        require(migrationTarget == address(0), "Staking pool is migrating");
         _totalSupply = _totalSupply.add(amount);
         _balances[msg.sender] = _balances[msg.sender].add(amount);
         stakingToken.safeTransferFrom(msg.sender, address(this), amount);
@@ -166,6 +222,7 @@ contract StakingRewards is
         require(msg.sender == zapContract, "Only zap contract");
         require(amount > 0, "Cannot stake 0");
         require(!isRetired, "Staking pool is retired");
+        require(migrationTarget == address(0), "Staking pool is migrating");
         _totalSupply = _totalSupply.add(amount);
         _balances[recipient] = _balances[recipient].add(amount);
         stakingToken.safeTransferFrom(msg.sender, address(this), amount);
@@ -290,6 +347,161 @@ contract StakingRewards is
         emit ZapContractUpdated(_zapContract);
     }
 
+    /**
+    @notice Move stakers' balances and pending rewards to migrationTarget.
+    @dev May only be called by migrator, once MIGRATION_DELAY has passed since
+     setMigration() so stakers who don't want to move can exit first. Accounts with
+     nothing staked or owed are passed through as zeroes, so batches don't have to
+     be filtered exactly.
+    @param accounts Stakers to move.
+     */
+    function migrate(address[] calldata accounts)
+        external
+        nonReentrant
+        updateReward(address(0))
+    {
+        require(msg.sender == migrator, "Only migrator");
+        require(migrationTarget != address(0), "No migration target");
+        require(block.timestamp >= migrationStart, "Migration delay not over");
+
+        uint256[] memory amounts = new uint256[](accounts.length);
+        uint256[] memory rewardAmounts = new uint256[](accounts.length);
+        uint256 totalAmount;
+        uint256 totalRewards;
+        for (uint256 i = 0; i < accounts.length; i++) {
+            (amounts[i], rewardAmounts[i]) = _migrateOut(accounts[i]);
+            totalAmount = totalAmount.add(amounts[i]);
+            totalRewards = totalRewards.add(rewardAmounts[i]);
+        }
+        _totalSupply = _totalSupply.sub(totalAmount);
+
+        // the target pulls exactly these amounts, leaving both allowances at zero
+        stakingToken.safeApprove(migrationTarget, totalAmount);
+        rewardsToken.safeApprove(migrationTarget, totalRewards);
+        StakingRewards(migrationTarget).acceptMigration(
+            accounts,
+            amounts,
+            rewardAmounts
+        );
+        emit Migrated(
+            migrationTarget,
+            accounts.length,
+            totalAmount,
+            totalRewards
+        );
+    }
+
+    // same as updateReward(account) after the pool-wide update, then zero the account
+    function _migrateOut(address account)
+        internal
+        returns (uint256 amount, uint256 reward)
+    {
+        amount = _balances[account];
+        if (!isRetired) {
+            reward = amount
+                .mul(rewardPerTokenStored.sub(userRewardPerTokenPaid[account]))
+                .div(1e18)
+                .add(rewards[account]);
+        }
+        _balances[account] = 0;
+        rewards[account] = 0;
+        userRewardPerTokenPaid[account] = rewardPerTokenStored;
+        emit MigratedOut(account, amount);
+    }
+
+    /**
+    @notice Credit stakers moved here from migrationSource.
+    @dev May only be called by migrationSource, from its migrate().
+    @param accounts Stakers being moved.
+    @param amounts Staked balance of each account.
+    @param rewardAmounts Pending rewards of each account.
+     */
+    function acceptMigration(
+        address[] calldata accounts,
+        uint256[] calldata amounts,
+        uint256[] calldata rewardAmounts
+    ) external nonReentrant notPaused updateReward(address(0)) {
+        require(msg.sender == migrationSource, "Only migration source");
+        require(!isRetired, "Staking pool is retired");
+        require(
+            accounts.length == amounts.length &&
+                accounts.length == rewardAmounts.length,
+            "length mismatch"
+        );
+
+        uint256 totalAmount;
+        uint256 totalRewards;
+        for (uint256 i = 0; i < accounts.length; i++) {
+            _migrateIn(accounts[i], amounts[i], rewardAmounts[i]);
+            totalAmount = totalAmount.add(amounts[i]);
+            totalRewards = totalRewards.add(rewardAmounts[i]);
+        }
+        _totalSupply = _totalSupply.add(totalAmount);
+
+        stakingToken.safeTransferFrom(msg.sender, address(this), totalAmount);
+        rewardsToken.safeTransferFrom(msg.sender, address(this), totalRewards);
+    }
+
+    // same as updateReward(account) after the pool-wide update, then credit the account
+    function _migrateIn(
+        address account,
+        uint256 amount,
+        uint256 reward
+    ) internal {
+        uint256 balance = _balances[account];
+        rewards[account] = balance
+            .mul(rewardPerTokenStored.sub(userRewardPerTokenPaid[account]))
+            .div(1e18)
+            .add(rewards[account])
+            .add(reward);
+        userRewardPerTokenPaid[account] = rewardPerTokenStored;
+        _balances[account] = balance.add(amount);
+        emit MigratedIn(account, amount);
+        if (reward > 0) {
+            emit RewardMigrated(account, reward);
+        }
+    }
+
+    /**
+    @notice Start (or cancel) moving our stakers to another pool.
+    @dev May only be called by owner. The target must have the same owner and use
+     the same staking and rewards tokens, and have this pool set as its
+     migrationSource. Those are only getters a malicious target could fake, so the
+     real protection is MIGRATION_DELAY: staking here closes immediately, and
+     stakers' tokens can't be moved until they have had time to exit. Setting a new
+     target restarts the delay. Pass zero addresses to cancel.
+    @param _migrationTarget Pool to move stakers to.
+    @param _migrator Address allowed to call migrate().
+     */
+    function setMigration(address _migrationTarget, address _migrator)
+        external
+        onlyOwner
+    {
+        uint256 start;
+        if (_migrationTarget != address(0)) {
+            StakingRewards target = StakingRewards(_migrationTarget);
+            require(target.owner() == owner, "owner mismatch");
+            require(
+                address(target.stakingToken()) == address(stakingToken) &&
+                    address(target.rewardsToken()) == address(rewardsToken),
+                "token mismatch"
+            );
+            start = block.timestamp.add(MIGRATION_DELAY);
+        }
+        migrationTarget = _migrationTarget;
+        migrator = _migrator;
+        migrationStart = start;
+        emit MigrationUpdated(_migrationTarget, _migrator, start);
+    }
+
+    /// @notice Set the pool allowed to move its stakers into this one.
+    /// @dev May only be called by owner, zero address to disallow.
+    /// @param _migrationSource Address of the old pool.
+    function setMigrationSource(address _migrationSource) external onlyOwner {
+        migrationSource = _migrationSource;
+        emit MigrationSourceUpdated(_migrationSource);
+    }
+
     /* ========== MODIFIERS ========== */
 
     modifier updateReward(address account) {
@@ -312,4 +524,19 @@ contract StakingRewards is
     event RewardsDurationUpdated(uint256 newDuration);
     event ZapContractUpdated(address _zapContract);
     event Recovered(address token, uint256 amount);
+    event MigrationUpdated(
+        address migrationTarget,
+        address migrator,
+        uint256 migrationStart
+    );
+    event MigrationSourceUpdated(address migrationSource);
+    event MigratedOut(address indexed user, uint256 amount);
+    event MigratedIn(address indexed user, uint256 amount);
+    event RewardMigrated(address indexed user, uint256 reward);
+    event Migrated(
+        address indexed migrationTarget,
+        uint256 accounts,
+        uint256 amount,
+        uint256 reward
+    );
 }
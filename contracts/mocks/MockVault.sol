@@ -0,0 +1,94 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity ^0.8.15;
+
+import "@openzeppelin_new/contracts/token/ERC20/extensions/draft-ERC20Permit.sol";
+import "@openzeppelin_new/contracts/token/ERC20/extensions/IERC20Metadata.sol";
+import "@openzeppelin_new/contracts/token/ERC20/utils/SafeERC20.sol";
+import "@openzeppelin_new/contracts/utils/math/Math.sol";
+
+/// @notice Minimal yearn vault (0.4.x interface) for local testing only.
+/// @dev pricePerShare is set directly instead of coming from strategy harvests.
+contract MockVault is ERC20Permit {
+    using SafeERC20 for IERC20;
+
+    uint256 internal constant MAX_UINT256 = type(uint256).max;
+
+    address public immutable token;
+    uint8 private immutable _decimals;
+
+    uint256 public depositLimit = MAX_UINT256;
+    uint256 public pricePerShare;
+
+    constructor(address _token)
+        ERC20("Mock yVault", "yvMOCK")
+        ERC20Permit("Mock yVault")
+    {
+        // immutables can't be read during construction
+        uint8 tokenDecimals = IERC20Metadata(_token).decimals();
+        token = _token;
+        _decimals = tokenDecimals;
+        pricePerShare = 10**tokenDecimals;
+    }
+
+    function decimals() public view override returns (uint8) {
+        return _decimals;
+    }
+
+    function totalAssets() public view returns (uint256) {
+        return IERC20(token).balanceOf(address(this));
+    }
+
+    /// @notice Same as yearn vaults, max uint deposits whatever fits under the limit.
+    function deposit(uint256 _amount, address _recipient)
+        external
+        returns (uint256 shares)
+    {
+        if (_amount == MAX_UINT256) {
+            _amount = Math.min(
+                depositLimit - totalAssets(),
+                IERC20(token).balanceOf(msg.sender)
+            );
+        } else {
+            require(
+                totalAssets() + _amount <= depositLimit,
+                "Vault: deposit limit"
+            );
+        }
+        require(_amount > 0, "Vault: zero deposit");
+
+        shares = (_amount * 10**_decimals) / pricePerShare;
+        IERC20(token).safeTransferFrom(msg.sender, address(this), _amount);
+        _mint(_recipient, shares);
+    }
+
+    function withdraw() external returns (uint256 amount) {
+        uint256 shares = balanceOf(msg.sender);
+        amount = (shares * pricePerShare) / 10**_decimals;
+        _burn(msg.sender, shares);
+        IERC20(token).safeTransfer(msg.sender, amount);
+    }
+
+    /// @notice Yearn-style permit, signature is packed as r, s, v.
+    function permit(
+        address _owner,
+        address _spender,
+        uint256 _amount,
+        uint256 _expiry,
+        bytes calldata _signature
+    ) external returns (bool) {
+        require(_signature.length == 65, "Vault: bad signature");
+        bytes32 r = bytes32(_signature[0:32]);
+        bytes32 s = bytes32(_signature[32:64]);
+        uint8 v = uint8(_signature[64]);
+        permit(_owner, _spender, _amount, _expiry, v, r, s);
+        return true;
+    }
+
+    function setDepositLimit(uint256 _limit) external {
+        depositLimit = _limit;
+    }
+
+    function setPricePerShare(uint256 _pricePerShare) external {
+        pricePerShare = _pricePerShare;
+    }
+}
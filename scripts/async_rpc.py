@@ -0,0 +1,365 @@
+"""
+asyncio JSON-RPC client for reading the staking contracts at volume.
+
+    - one aiohttp session, so connections are pooled and kept alive
+    - identical read-only requests (eth_call with the same target, data and block)
+      that are in flight together share one request
+    - a token bucket keeps us under the provider's requests-per-second limit, and
+      429s back off and retry
+    - concurrent requests are packed into JSON-RPC batches, flushed when full or
+      after a short delay
+
+brownie's web3 is synchronous, so use this where we need thousands of reads (earned()
+for every staker, balances across all pools, ...) rather than for transactions.
+
+    python -m scripts.async_rpc --reads 10000
+    brownie run async_rpc main <pool> <account> ...
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import time
+
+import aiohttp
+from eth_utils import keccak, to_checksum_address
+
+COALESCED = {"eth_call", "eth_chainId", "eth_blockNumber", "eth_getBalance"}
+
+
+class RPCError(Exception):
+    def __init__(self, code, message):
+        super().__init__(f"{code}: {message}")
+        self.code = code
+
+
+class TokenBucket:
+    """
+    Allows `rate` requests per second on average, bursts of up to `burst` (by default
+    `rate`, and at least one request). Every request is charged, so a batch can't ask
+    for more than one burst at once.
+    """
+
+    def __init__(self, rate, burst=None):
+        if burst is not None and burst < 1:
+            raise ValueError(f"burst of {burst} can't fit a single request")
+        self.rate = rate
+        self.capacity = burst or max(1, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens=1):
+        if tokens > self.capacity:
+            raise ValueError(f"{tokens} requests is over the burst of {self.capacity}")
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+
+class AsyncRPC:
+    def __init__(
+        self,
+        url,
+        max_connections=8,
+        batch_size=100,
+        batch_delay=0.002,
+        rate=None,
+        burst=None,
+        retries=5,
+    ):
+        self.url = url
+        self.max_connections = max_connections
+        self.batch_delay = batch_delay
+        self.bucket = TokenBucket(rate, burst) if rate else None
+
+        # batches are charged per request, so one has to fit in a burst
+        if self.bucket:
+            batch_size = max(1, min(batch_size, int(self.bucket.capacity)))
+        self.batch_size = batch_size
+        self.retries = retries
+        self.stats = {"requests": 0, "coalesced": 0, "http": 0, "throttled": 0}
+
+        self._ids = itertools.count()
+        self._in_flight = {}
+        self._pending = []
+        self._flush_handle = None
+        self._tasks = set()
+        self._session = None
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.max_connections)
+        self._session = aiohttp.ClientSession(connector=connector)
+        return self
+
+    async def __aexit__(self, *exc):
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self._session.close()
+
+    # requests
+
+    async def request(self, method, params=()):
+        params = list(params)
+        self.stats["requests"] += 1
+        key = json.dumps([method, params]) if method in COALESCED else None
+        if key in self._in_flight:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(self._in_flight[key])
+
+        future = asyncio.get_running_loop().create_future()
+        if key:
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        self._pending.append((method, params, future))
+
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            loop = asyncio.get_running_loop()
+            self._flush_handle = loop.call_later(self.batch_delay, self._flush)
+        return await asyncio.shield(future)
+
+    async def call(self, to, data, block="latest"):
+        """eth_call, returns the raw result bytes."""
+        if isinstance(block, int):
+            block = hex(block)
+        result = await self.request("eth_call", [{"to": to, "data": data}, block])
+        return bytes.fromhex(result[2:])
+
+    # batching
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        while self._pending:
+            batch = self._pending[: self.batch_size]
+            del self._pending[: self.batch_size]
+            task = asyncio.ensure_future(self._send(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _post(self, payload):
+        for attempt in range(self.retries + 1):
+            if self.bucket:
+                await self.bucket.acquire(
+                    len(payload) if isinstance(payload, list) else 1
+                )
+            self.stats["http"] += 1
+            async with self._session.post(self.url, json=payload) as response:
+                if response.status == 429 and attempt < self.retries:
+                    self.stats["throttled"] += 1
+                    retry_after = float(response.headers.get("Retry-After", 0))
+                    await asyncio.sleep(max(retry_after, 0.05 * 2**attempt))
+                    continue
+                response.raise_for_status()
+                return await response.json(content_type=None)
+
+    async def _send(self, batch):
+        requests = {}
+        for method, params, future in batch:
+            request_id = next(self._ids)
+            request = {"jsonrpc": "2.0", "id": request_id, "method": method}
+            request["params"] = params
+            requests[request_id] = (request, future)
+
+        # a batch of one is sent as a plain request, some nodes reject [req]
+        payload = [request for request, _ in requests.values()]
+        try:
+            responses = await self._post(payload if len(payload) > 1 else payload[0])
+        except Exception as exc:
+            for _, future in requests.values():
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        if isinstance(responses, dict):
+            responses = [responses]
+        for response in responses:
+            _, future = requests.pop(response.get("id"), (None, None))
+            if future is None or future.done():
+                continue
+            if "error" in response:
+                error = response["error"]
+                future.set_exception(RPCError(error.get("code"), error.get("message")))
+            else:
+                future.set_result(response["result"])
+        for _, future in requests.values():
+            if not future.done():
+                future.set_exception(RPCError(None, "missing from batch response"))
+
+
+# staking contract reads
+
+
+def selector(signature):
+    return "0x" + keccak(text=signature)[:4].hex()
+
+
+EARNED = selector("earned(address)")
+BALANCE_OF = selector("balanceOf(address)")
+
+
+def encode_address_call(function_selector, account):
+    return function_selector + str(account)[2:].lower().rjust(64, "0")
+
+
+async def read_uint(rpc, to, function_selector, account, block="latest"):
+    data = encode_address_call(function_selector, account)
+    return int.from_bytes(await rpc.call(to, data, block), "big")
+
+
+async def earned_many(rpc, pool, accounts, block="latest"):
+    """earned(account) for every account, as a list in the same order."""
+    return await asyncio.gather(
+        *(read_uint(rpc, pool, EARNED, account, block) for account in accounts)
+    )
+
+
+# local stand-in node
+
+
+class StandInNode:
+    """
+    Minimal JSON-RPC node answering earned()/balanceOf() eth_calls, for benchmarks.
+    Every HTTP round trip costs `latency` seconds and each call `per_call` seconds,
+    roughly what a nearby provider looks like. Over `rate` calls/s it returns 429.
+    """
+
+    def __init__(self, latency=0.002, per_call=0.00002, rate=None, port=0):
+        self.latency = latency
+        self.per_call = per_call
+        self.bucket_rate = rate
+        self.port = port
+        self.calls = 0
+        self.http = 0
+        self._window = (0, 0)
+        self._runner = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def _answer(self, request):
+        self.calls += 1
+        if request["method"] != "eth_call":
+            return {"id": request["id"], "error": {"code": -32601, "message": "nope"}}
+        data = request["params"][0]["data"]
+        account = int(data[10:], 16)
+        value = (account * 7919) % 10**21
+        result = "0x" + value.to_bytes(32, "big").hex()
+        return {"jsonrpc": "2.0", "id": request["id"], "result": result}
+
+    def _throttled(self, calls):
+        if not self.bucket_rate:
+            return False
+        second, used = self._window
+        now = int(time.monotonic())
+        if now != second:
+            second, used = now, 0
+        if used + calls > self.bucket_rate:
+            return True
+        self._window = (second, used + calls)
+        return False
+
+    async def _handle(self, http_request):
+        from aiohttp import web
+
+        payload = await http_request.json()
+        requests = payload if isinstance(payload, list) else [payload]
+        self.http += 1
+        if self._throttled(len(requests)):
+            return web.Response(status=429, headers={"Retry-After": "0.1"})
+        await asyncio.sleep(self.latency + self.per_call * len(requests))
+        responses = [self._answer(r) for r in requests]
+        return web.json_response(
+            responses if isinstance(payload, list) else responses[0]
+        )
+
+    async def __aenter__(self):
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_post("/", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._runner.cleanup()
+
+
+def fake_accounts(count, seed=0):
+    return [
+        to_checksum_address(
+            keccak(seed.to_bytes(8, "big") + i.to_bytes(8, "big"))[-20:]
+        )
+        for i in range(count)
+    ]
+
+
+async def benchmark(reads=10_000, latency=0.002, rate=None, duplicates=0.1):
+    pool = "0x" + "11" * 20
+    accounts = fake_accounts(int(reads * (1 - duplicates)) or 1)
+    accounts = (accounts * 2)[:reads]
+    results = {}
+
+    async with StandInNode(latency=latency, rate=rate) as node:
+        # what brownie does: one request at a time, one round trip each
+        async with AsyncRPC(
+            node.url, max_connections=1, batch_size=1, batch_delay=0
+        ) as rpc:
+            start = time.perf_counter()
+            serial = [await read_uint(rpc, pool, EARNED, a) for a in accounts]
+            results["serial"] = (time.perf_counter() - start, dict(rpc.stats))
+
+        async with AsyncRPC(node.url, rate=rate and rate * 0.9) as rpc:
+            start = time.perf_counter()
+            concurrent = await earned_many(rpc, pool, accounts)
+            results["concurrent"] = (time.perf_counter() - start, dict(rpc.stats))
+
+    assert serial == concurrent
+    return results
+
+
+def print_benchmark(results, reads):
+    print(f"{'mode':<12}{'seconds':>10}{'reads/s':>12}{'http':>8}{'coalesced':>11}")
+    for mode, (seconds, stats) in results.items():
+        print(
+            f"{mode:<12}{seconds:>10.2f}{reads / seconds:>12,.0f}"
+            f"{stats['http']:>8,}{stats['coalesced']:>11,}"
+        )
+
+
+def main(pool=None, *accounts, reads=10_000):
+    if pool is None:
+        results = asyncio.run(benchmark(reads))
+        print_benchmark(results, reads)
+        return
+
+    from brownie import web3
+
+    async def read():
+        async with AsyncRPC(web3.provider.endpoint_uri) as rpc:
+            return await earned_many(rpc, pool, accounts)
+
+    for account, earned in zip(accounts, asyncio.run(read())):
+        print(account, earned)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--reads", type=int, default=10_000)
+    main(reads=parser.parse_args().reads)
@@ -0,0 +1,292 @@
+"""
+Reward accrual checkpoint index for O(log n) earned() lookups at any timestamp.
+
+Every updateReward-triggering event (Staked, StakedFor, Withdrawn, RewardPaid,
+RewardAdded, and the migration events) is replayed through the contract math, and we record the pool's
+rewardPerTokenStored, totalSupply and reward period right after it. Between two
+checkpoints rewardPerToken() is a closed form, so any user's accrued reward at any
+timestamp is a binary search plus O(1) integer arithmetic, matching earned() exactly.
+
+Note that getReward() with nothing to claim runs updateReward without emitting an
+event, so it isn't checkpointed. It can only shift rewardPerTokenStored by
+truncation dust.
+
+    brownie run checkpoints main <pool> <from_block>
+    python -m scripts.checkpoints --benchmark 10000000
+"""
+import argparse
+import time
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+
+import numpy as np
+
+from scripts.reward_math import PRECISION, StakingRewardsModel
+
+# one pool event, as decoded from logs or read back from an archive
+PoolEvent = namedtuple(
+    "PoolEvent", "block log_index timestamp name account amount", defaults=(None, 0)
+)
+
+UPDATE_EVENTS = ("Staked", "StakedFor", "Withdrawn", "RewardPaid", "RewardAdded")
+MIGRATION_EVENTS = ("MigratedOut", "MigratedIn", "RewardMigrated")
+# archived events store their index in here, so only ever append
+REPLAYED_EVENTS = (
+    UPDATE_EVENTS + ("RewardsDurationUpdated", "Recovered") + MIGRATION_EVENTS
+)
+WIDE = ("stored", "supply", "balance", "rewards")
+WORDS = 4  # uint256 values as 64-bit words, most significant first
+MASK64 = 2**64 - 1
+
+
+class CheckpointIndex:
+    def __init__(self, rewards_token=None, capacity=1024):
+        self.model = StakingRewardsModel()
+        self.rewards_token = rewards_token
+        self.retired_at = None
+        self.size = 0
+
+        # one row per checkpoint, uint256 values are stored as four 64-bit words
+        self._timestamp = np.zeros(capacity, dtype=np.uint64)
+        self._period = np.zeros(capacity, dtype=np.uint32)
+        self._wide = {
+            name: np.zeros((capacity, WORDS), dtype=np.uint64) for name in WIDE
+        }
+
+        # reward periods change rarely, so rows point at (rate, period finish)
+        self.periods = [(0, 0)]
+
+        # rows touching each user, their paid snapshot is that row's stored value
+        self.users = {}
+
+    # building
+
+    def _grow(self):
+        capacity = max(1, 2 * self.size)
+        self._timestamp = np.resize(self._timestamp, capacity)
+        self._period = np.resize(self._period, capacity)
+        for name, column in self._wide.items():
+            self._wide[name] = np.resize(column, (capacity, WORDS))
+
+    def _checkpoint(self, timestamp, account):
+        model = self.model
+        if self.size and timestamp < int(self._timestamp[self.size - 1]):
+            raise ValueError("events must be applied in order")
+        if self.size == self._timestamp.size:
+            self._grow()
+
+        values = {
+            "stored": model.reward_per_token_stored,
+            "supply": model.total_supply,
+            "balance": model.balances.get(account, 0),
+            "rewards": model.rewards.get(account, 0),
+        }
+        i = self.size
+        for name, value in values.items():
+            if value >> 64 * WORDS:
+                raise ValueError(f"{name} too large for checkpoint index")
+            self._wide[name][i] = [
+                (value >> 64 * shift) & MASK64 for shift in reversed(range(WORDS))
+            ]
+        self._timestamp[i] = timestamp
+        self._period[i] = len(self.periods) - 1
+        if account is not None:
+            self.users.setdefault(account, array("Q")).append(i)
+        self.size += 1
+
+    def apply(self, event):
+        """Replay one event through the contract math and checkpoint the result."""
+        model, ts = self.model, event.timestamp
+        if event.name in ("Staked", "StakedFor"):
+            model.stake(event.account, event.amount, ts)
+        elif event.name == "Withdrawn":
+            model.withdraw(event.account, event.amount, ts)
+        elif event.name == "RewardPaid":
+            model.get_reward(event.account, ts)
+        elif event.name == "RewardAdded":
+            model.notify_reward_amount(event.amount, ts, check_balance=False)
+            self.periods.append((model.reward_rate, model.period_finish))
+        elif event.name == "MigratedOut":
+            model.migrate_out(event.account, ts)
+        elif event.name == "MigratedIn":
+            model.migrate_in(event.account, event.amount, 0, ts)
+        elif event.name == "RewardMigrated":
+            model.migrate_in(event.account, 0, event.amount, ts)
+        elif event.name == "RewardsDurationUpdated":
+            model.rewards_duration = event.amount
+            return
+        elif event.name == "Recovered":
+            # only sweeping the rewards token retires the pool
+            if event.account == self.rewards_token:
+                model.is_retired = True
+                self.retired_at = ts
+            return
+        else:
+            return
+        self._checkpoint(ts, event.account)
+
+    def extend(self, events):
+        for event in events:
+            self.apply(event)
+        return self
+
+    # queries
+
+    def _value(self, name, i):
+        value = 0
+        for word in self._wide[name][i]:
+            value = (value << 64) | int(word)
+        return value
+
+    def _row(self, timestamp):
+        # search with a matching dtype, mixed int types make numpy copy the column
+        times = self._timestamp[: self.size]
+        return int(np.searchsorted(times, np.uint64(timestamp), "right")) - 1
+
+    def _reward_per_token(self, row, timestamp):
+        stored, supply = self._value("stored", row), self._value("supply", row)
+        if supply == 0:
+            return stored
+
+        # updateReward() left lastUpdateTime at the checkpoint, capped to periodFinish
+        rate, finish = self.periods[self._period[row]]
+        last_update = min(int(self._timestamp[row]), finish)
+        elapsed = min(timestamp, finish) - last_update
+        return stored + elapsed * rate * PRECISION // supply
+
+    def reward_per_token(self, timestamp):
+        """rewardPerToken() as the contract would have returned it at `timestamp`."""
+        row = self._row(timestamp)
+        if row < 0:
+            return 0
+
+        # like the contract, an empty pool returns rewardPerTokenStored even if retired
+        retired = self.retired_at is not None and timestamp >= self.retired_at
+        if retired and self._value("supply", row):
+            return 0
+        return self._reward_per_token(row, timestamp)
+
+    def earned(self, account, timestamp):
+        """earned(account) as the contract would have returned it at `timestamp`."""
+        if self.retired_at is not None and timestamp >= self.retired_at:
+            return 0
+        rows = self.users.get(account)
+        row = self._row(timestamp)
+        if not rows or row < 0:
+            return 0
+        user_row = rows[bisect_right(rows, row) - 1] if rows[0] <= row else None
+        if user_row is None:
+            return 0
+        balance = self._value("balance", user_row)
+        paid = self._value("stored", user_row)
+        rewards = self._value("rewards", user_row)
+        reward_per_token = self._reward_per_token(row, timestamp)
+        return balance * (reward_per_token - paid) // PRECISION + rewards
+
+
+def events_from_chain(pool, from_block, to_block=None):
+    """Decode a pool's events into time-ordered PoolEvents."""
+    from brownie import chain, web3
+
+    to_block = to_block or chain.height
+    timestamps = {}
+    events = []
+    for name in REPLAYED_EVENTS:
+        for log in getattr(pool.events, name).get_sequence(from_block, to_block):
+            args = log.args
+            if log.blockNumber not in timestamps:
+                timestamps[log.blockNumber] = web3.eth.get_block(log.blockNumber)[
+                    "timestamp"
+                ]
+            account = args.get("user") or args.get("token")
+            amount = next(
+                args[k] for k in ("amount", "reward", "newDuration") if k in args
+            )
+            events.append(
+                PoolEvent(
+                    log.blockNumber,
+                    log.logIndex,
+                    timestamps[log.blockNumber],
+                    name,
+                    account,
+                    amount,
+                )
+            )
+    return sorted(events, key=lambda e: (e.block, e.log_index))
+
+
+def synthetic_events(count, users=10_000, seed=0):
+    """A realistic-looking event stream, for benchmarks."""
+    rng = np.random.default_rng(seed)
+    gaps = rng.integers(1, 120, count)
+    kinds = rng.choice(4, count, p=(0.45, 0.25, 0.25, 0.05))
+    accounts = rng.integers(0, users, count)
+    amounts = rng.integers(1, 10**6, count).astype(object) * 10**15
+    stakes = {}
+    timestamp = 1_600_000_000
+    for i in range(count):
+        timestamp += int(gaps[i])
+        user = f"user{accounts[i]}"
+        kind = kinds[i]
+        if i % 5_000 == 0 or kind == 3:
+            yield PoolEvent(i, 0, timestamp, "RewardAdded", None, 10**21)
+        elif kind == 1 and stakes.get(user, 0) >= amounts[i]:
+            stakes[user] -= amounts[i]
+            yield PoolEvent(i, 0, timestamp, "Withdrawn", user, amounts[i])
+        elif kind == 2 and user in stakes:
+            yield PoolEvent(i, 0, timestamp, "RewardPaid", user, 0)
+        else:
+            stakes[user] = stakes.get(user, 0) + amounts[i]
+            yield PoolEvent(i, 0, timestamp, "Staked", user, amounts[i])
+
+
+def benchmark(count, lookups=100_000):
+    start = time.perf_counter()
+    index = CheckpointIndex(capacity=count).extend(synthetic_events(count))
+    build = time.perf_counter() - start
+
+    rng = np.random.default_rng(1)
+    first, last = int(index._timestamp[0]), int(index._timestamp[index.size - 1])
+    times = rng.integers(first, last, lookups).tolist()
+    users = list(index.users)
+    picks = rng.integers(0, len(users), lookups).tolist()
+
+    start = time.perf_counter()
+    for t, u in zip(times, picks):
+        index.earned(users[u], t)
+    query = time.perf_counter() - start
+    return {
+        "checkpoints": index.size,
+        "users": len(users),
+        "build_seconds": build,
+        "lookup_microseconds": query / lookups * 1e6,
+    }
+
+
+def main(pool=None, from_block=0, benchmark_size=0):
+    if benchmark_size:
+        result = benchmark(int(benchmark_size))
+        print(
+            f"{result['checkpoints']:,} checkpoints for {result['users']:,} users"
+            f" built in {result['build_seconds']:.1f}s,"
+            f" earned() lookup {result['lookup_microseconds']:.1f}us"
+        )
+        return
+
+    from brownie import StakingRewards, chain
+
+    pool = StakingRewards.at(pool)
+    index = CheckpointIndex(rewards_token=pool.rewardsToken())
+    index.extend(events_from_chain(pool, int(from_block)))
+    now = chain[-1].timestamp
+    print(f"{index.size:,} checkpoints, {len(index.users):,} users")
+    for account in list(index.users)[:10]:
+        print(account, index.earned(account, now), pool.earned(account))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--benchmark", type=int, default=10_000_000)
+    args = parser.parse_args()
+    main(benchmark_size=args.benchmark)
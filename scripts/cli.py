@@ -0,0 +1,9 @@
+"""Argument parsing shared by the `brownie run` entry points."""
+from brownie import accounts
+
+
+def load_account(name):
+    """A 0x address, impersonated on a fork, or the id of a saved brownie account."""
+    if name.startswith("0x"):
+        return accounts.at(name, force=True)
+    return accounts.load(name)
@@ -0,0 +1,115 @@
+"""
+Content-hash keyed compile cache, reporting what an incremental build saved.
+
+brownie already keeps build/contracts/*.json keyed by each source's sha1 (plus the
+solc settings), recompiling only changed sources and their dependents, and it never
+loads paths with a `_`-prefixed part (_originalStakingRewards.sol,
+_StakingRewardsClonable.sol, contracts/_flattened/). So the cache to keep warm is
+build/ itself. CI restores it keyed by hashFiles() of the sources, and this wrapper
+times `brownie compile` and records how long each source took to build, so later
+runs can report how much compile time reusing it saved.
+
+    python -m scripts.compile_cache [--size]
+"""
+import argparse
+import hashlib
+import json
+import subprocess
+import time
+from pathlib import Path
+
+SUFFIXES = (".sol", ".vy")
+TIMES_FILE = "compile_times.json"
+
+
+def project_sources(root="."):
+    """source path -> sha1 for everything brownie would compile."""
+    root = Path(root)
+    sources = {}
+    for path in sorted(root.glob("contracts/**/*")):
+        relative = path.relative_to(root)
+        if path.suffix not in SUFFIXES or any(
+            p.startswith("_") for p in relative.parts
+        ):
+            continue
+        sources[relative.as_posix()] = hashlib.sha1(path.read_bytes()).hexdigest()
+    return sources
+
+
+def build_artifacts(root="."):
+    """build json path -> (mtime, sourcePath) for compiled contract artifacts."""
+    artifacts = {}
+    for path in Path(root).glob("build/contracts/*.json"):
+        try:
+            source = json.loads(path.read_text())["sourcePath"]
+        except (ValueError, KeyError):
+            continue
+        artifacts[path] = (path.stat().st_mtime_ns, source)
+    return artifacts
+
+
+def compile_project(root=".", size=False):
+    """
+    Run `brownie compile`, work out which sources were rebuilt from the artifacts it
+    rewrote, and update the per-source timings. Returns a summary dict.
+    """
+    root = Path(root)
+    sources = project_sources(root)
+    times_path = root / "build" / TIMES_FILE
+    times = json.loads(times_path.read_text()) if times_path.exists() else {}
+    before = build_artifacts(root)
+
+    start = time.perf_counter()
+    command = ["brownie", "compile"] + (["--size"] if size else [])
+    subprocess.run(command, cwd=root, check=True)
+    elapsed = time.perf_counter() - start
+
+    after = build_artifacts(root)
+    rebuilt = {
+        source
+        for path, (mtime, source) in after.items()
+        if before.get(path, (None,))[0] != mtime and source in sources
+    }
+
+    # solc builds a whole batch at once, share the time out by source size
+    weights = {s: (root / s).stat().st_size for s in rebuilt}
+    total = sum(weights.values()) or 1
+    for source in rebuilt:
+        times[source] = {
+            "sha1": sources[source],
+            "seconds": elapsed * weights[source] / total,
+        }
+
+    reused = [s for s in sources if s not in rebuilt]
+    saved = sum(
+        times[s]["seconds"]
+        for s in reused
+        if s in times and times[s]["sha1"] == sources[s]
+    )
+    times_path.parent.mkdir(exist_ok=True)
+    times_path.write_text(json.dumps(times, indent=2, sort_keys=True))
+    return {
+        "sources": len(sources),
+        "rebuilt": sorted(rebuilt),
+        "reused": sorted(reused),
+        "seconds": elapsed,
+        "saved": saved,
+    }
+
+
+def main(size=False):
+    result = compile_project(size=size)
+    print(
+        f"\n{len(result['rebuilt'])} of {result['sources']} sources compiled in"
+        f" {result['seconds']:.1f}s, {len(result['reused'])} reused from build/"
+    )
+    for source in result["rebuilt"]:
+        print(f"  compiled  {source}")
+    if result["reused"]:
+        print(f"Cache saved an estimated {result['saved']:.1f}s of compilation")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", action="store_true")
+    main(parser.parse_args().size)
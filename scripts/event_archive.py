@@ -0,0 +1,433 @@
+"""
+Compact archive format for pool event history.
+
+    header   b"SPEV" | version u8 | codec u8 (0 zlib, 1 zstd)
+    chunks   compressed length u32 | compressed chunk, repeated
+    index    per chunk: first block, last block, offset, count (u64 each)
+    trailer  index offset u64 | chunk count u32 | b"SPEV"
+
+Each chunk holds up to `chunk_size` events, stored column by column so similar
+bytes sit together:
+
+    count, then LEB128 varints for block deltas, log indexes and timestamp deltas,
+    one byte per event name, account ids into the chunk's own address table, and
+    amounts as a byte length plus big-endian bytes (uint256 in as few bytes as needed)
+
+Chunks don't depend on each other, so the index lets a reader jump straight to a
+block range. zstd is used when the `zstandard` package is installed, zlib otherwise.
+
+    python -m scripts.event_archive --benchmark 1000000
+"""
+import argparse
+import csv
+import json
+import os
+import struct
+import time
+import zlib
+from functools import lru_cache
+
+import numpy as np
+from eth_utils import to_checksum_address
+
+from scripts.checkpoints import REPLAYED_EVENTS, PoolEvent, synthetic_events
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MAGIC = b"SPEV"
+VERSION = 1
+ZLIB, ZSTD = 0, 1
+HEADER = struct.Struct("<4sBB")
+CHUNK_LENGTH = struct.Struct("<I")
+INDEX_ENTRY = struct.Struct("<QQQQ")
+TRAILER = struct.Struct("<QI4s")
+NAMES = REPLAYED_EVENTS
+NAME_CODES = {name: i for i, name in enumerate(NAMES)}
+
+
+# varints
+
+
+def encode_varints(values):
+    """LEB128 encode an array of unsigned 64-bit values."""
+    values = np.asarray(values, dtype=np.uint64)
+    groups = np.zeros((values.size, 10), dtype=np.uint8)
+    present = np.zeros((values.size, 10), dtype=bool)
+    present[:, 0] = True
+    for k in range(10):
+        rest = values >> np.uint64(7 * (k + 1))
+        groups[:, k] = (values >> np.uint64(7 * k)) & np.uint64(0x7F)
+        if k < 9:
+            more = rest != 0
+            groups[more, k] |= 0x80
+            present[:, k + 1] = more
+            if not more.any():
+                break
+    return groups[present].tobytes()
+
+
+def decode_varints(data, count, offset=0):
+    """Decode `count` LEB128 varints starting at `offset`, returns (values, end)."""
+    raw = np.frombuffer(data, dtype=np.uint8, offset=offset)
+    ends = np.flatnonzero(raw < 0x80)[:count]
+    if ends.size < count:
+        raise ValueError("Truncated varint column")
+    if count == 0:
+        return np.zeros(0, dtype=np.uint64), offset
+    used = int(ends[-1]) + 1
+    raw = raw[:used]
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    position = np.arange(used) - np.repeat(starts, ends - starts + 1)
+    shifted = (raw & 0x7F).astype(np.uint64) << (7 * position).astype(np.uint64)
+    return np.add.reduceat(shifted, starts), offset + used
+
+
+def _read_varint(data, offset):
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        value |= (byte & 0x7F) << shift
+        offset += 1
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+# chunk encoding
+
+
+# checksumming is a keccak per address, and the same stakers show up in every chunk
+@lru_cache(maxsize=1 << 16)
+def _checksum(address):
+    return to_checksum_address(address)
+
+
+def _encode_account(account):
+    if account.startswith("0x") and len(account) == 42:
+        raw = bytes.fromhex(account[2:])
+        if _checksum(raw) == account:
+            return b"\x00" + raw
+    text = account.encode()
+    return b"\x01" + encode_varints([len(text)]) + text
+
+
+def encode_chunk(events):
+    addresses = {}
+    accounts, amounts = [], []
+    for event in events:
+        if event.account is None:
+            accounts.append(0)
+        else:
+            accounts.append(addresses.setdefault(event.account, len(addresses)) + 1)
+        amounts.append(
+            event.amount.to_bytes((event.amount.bit_length() + 7) // 8, "big")
+        )
+
+    blocks = np.array([e.block for e in events], dtype=np.int64)
+    timestamps = np.array([e.timestamp for e in events], dtype=np.int64)
+    block_deltas = np.diff(blocks, prepend=0)
+    time_deltas = np.diff(timestamps, prepend=0)
+    if (block_deltas[1:] < 0).any() or (time_deltas[1:] < 0).any():
+        raise ValueError("Events must be in block order")
+
+    parts = [
+        encode_varints([len(events), len(addresses)]),
+        b"".join(_encode_account(a) for a in addresses),
+        encode_varints(block_deltas),
+        encode_varints([e.log_index for e in events]),
+        encode_varints(time_deltas),
+        bytes(NAME_CODES[e.name] for e in events),
+        encode_varints(accounts),
+        bytes(len(a) for a in amounts),
+        b"".join(amounts),
+    ]
+    return b"".join(parts)
+
+
+def decode_chunk(data, from_block=0, to_block=None):
+    """Events in a decoded chunk, optionally only those within a block range."""
+    (count, address_count), offset = decode_varints(data, 2)
+    count, address_count = int(count), int(address_count)
+
+    addresses = [None]
+    for _ in range(address_count):
+        tag = data[offset]
+        if tag == 0:
+            addresses.append(_checksum(data[offset + 1 : offset + 21]))
+            offset += 21
+        else:
+            length, offset = _read_varint(data, offset + 1)
+            addresses.append(data[offset : offset + length].decode())
+            offset += length
+
+    block_deltas, offset = decode_varints(data, count, offset)
+    log_indexes, offset = decode_varints(data, count, offset)
+    time_deltas, offset = decode_varints(data, count, offset)
+    names = data[offset : offset + count]
+    offset += count
+    account_ids, offset = decode_varints(data, count, offset)
+    lengths = np.frombuffer(data, dtype=np.uint8, count=count, offset=offset)
+    ends = (offset + count + np.cumsum(lengths, dtype=np.int64)).tolist()
+
+    # only build the events we were asked for
+    blocks = np.cumsum(block_deltas)
+    first = int(np.searchsorted(blocks, from_block, "left"))
+    last = (
+        count if to_block is None else int(np.searchsorted(blocks, to_block, "right"))
+    )
+    blocks = blocks.tolist()
+    timestamps = np.cumsum(time_deltas).tolist()
+    log_indexes = log_indexes.tolist()
+    account_ids = account_ids.tolist()
+    from_bytes = int.from_bytes
+    start = ends[first - 1] if first else offset + count
+    for i in range(first, last):
+        yield PoolEvent(
+            blocks[i],
+            log_indexes[i],
+            timestamps[i],
+            NAMES[names[i]],
+            addresses[account_ids[i]],
+            from_bytes(data[start : ends[i]], "big"),
+        )
+        start = ends[i]
+
+
+# streaming read and write
+
+
+class ArchiveWriter:
+    """Append events in (block, log index) order, chunks are flushed as they fill."""
+
+    def __init__(self, path, chunk_size=65_536, level=3, codec=None):
+        if codec is None:
+            codec = ZSTD if zstandard else ZLIB
+        if codec == ZSTD and zstandard is None:
+            raise ValueError("zstd needs the zstandard package")
+        self.codec = codec
+        self.chunk_size = chunk_size
+        self._compress = (
+            zstandard.ZstdCompressor(level=level).compress
+            if codec == ZSTD
+            else lambda data: zlib.compress(data, level)
+        )
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, VERSION, codec))
+        self._buffer = []
+        self._index = []
+        self._last = (-1, -1)
+        self.count = 0
+
+    def write(self, event):
+        position = (event.block, event.log_index)
+        if position <= self._last:
+            raise ValueError("Events must be in block order")
+        self._last = position
+        self._buffer.append(event)
+        if len(self._buffer) >= self.chunk_size:
+            self._flush()
+
+    def extend(self, events):
+        for event in events:
+            self.write(event)
+        return self
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        data = self._compress(encode_chunk(self._buffer))
+        offset = self._file.tell()
+        self._file.write(CHUNK_LENGTH.pack(len(data)) + data)
+        first, last = self._buffer[0].block, self._buffer[-1].block
+        self._index.append((first, last, offset, len(self._buffer)))
+        self.count += len(self._buffer)
+        self._buffer = []
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._flush()
+        index_offset = self._file.tell()
+        for entry in self._index:
+            self._file.write(INDEX_ENTRY.pack(*entry))
+        self._file.write(TRAILER.pack(index_offset, len(self._index), MAGIC))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ArchiveReader:
+    """Iterate an archive, or only the chunks covering a block range."""
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        magic, version, self.codec = HEADER.unpack(self._file.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a pool event archive")
+        if self.codec == ZSTD:
+            if zstandard is None:
+                raise ValueError("Archive is zstd compressed, install zstandard")
+            self._decompress = zstandard.ZstdDecompressor().decompress
+        else:
+            self._decompress = zlib.decompress
+
+        self._file.seek(-TRAILER.size, os.SEEK_END)
+        index_offset, chunks, magic = TRAILER.unpack(self._file.read(TRAILER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is truncated")
+        self._file.seek(index_offset)
+        raw = self._file.read(chunks * INDEX_ENTRY.size)
+        self.index = list(INDEX_ENTRY.iter_unpack(raw))
+        self.count = sum(entry[3] for entry in self.index)
+
+    def _chunk(self, offset):
+        self._file.seek(offset)
+        (length,) = CHUNK_LENGTH.unpack(self._file.read(CHUNK_LENGTH.size))
+        return self._decompress(self._file.read(length))
+
+    def events(self, from_block=0, to_block=None):
+        for first, last, offset, _ in self.index:
+            if last < from_block or (to_block is not None and first > to_block):
+                continue
+            yield from decode_chunk(self._chunk(offset), from_block, to_block)
+
+    def __iter__(self):
+        return self.events()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_archive(path, events, **kwargs):
+    with ArchiveWriter(path, **kwargs) as writer:
+        writer.extend(events)
+    return writer.count
+
+
+# benchmarks against JSON lines and CSV
+
+
+def _write_json(path, events):
+    with open(path, "w") as f:
+        for event in events:
+            f.write(json.dumps(event._asdict()) + "\n")
+
+
+def _read_json(path):
+    with open(path) as f:
+        for line in f:
+            yield PoolEvent(**json.loads(line))
+
+
+def _write_csv(path, events):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(PoolEvent._fields)
+        writer.writerows(events)
+
+
+def _read_csv(path):
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        next(reader)
+        for block, log_index, timestamp, name, account, amount in reader:
+            yield PoolEvent(
+                int(block),
+                int(log_index),
+                int(timestamp),
+                name,
+                account or None,
+                int(amount),
+            )
+
+
+def benchmark_events(count, users=10_000, seed=0):
+    """synthetic_events() with real-looking addresses and several events per block."""
+    from scripts.async_rpc import fake_accounts
+
+    addresses = fake_accounts(users, seed)
+    rng = np.random.default_rng(seed)
+    per_block = rng.integers(1, 4, count)
+    block, log_index = 12_000_000, 0
+    for event, step in zip(synthetic_events(count, users, seed), per_block.tolist()):
+        if log_index >= step:
+            block, log_index = block + 1, 0
+        account = addresses[int(event.account[4:])] if event.account else None
+        yield event._replace(block=block, log_index=log_index, account=account)
+        log_index += 1
+
+
+def benchmark(count=1_000_000, directory="."):
+    events = list(benchmark_events(count))
+    formats = {
+        "archive": (lambda p, e: write_archive(p, e), lambda p: ArchiveReader(p)),
+        "json": (_write_json, _read_json),
+        "csv": (_write_csv, _read_csv),
+    }
+    results = {}
+    for name, (write, read) in formats.items():
+        path = os.path.join(directory, f"events_benchmark.{name}")
+        start = time.perf_counter()
+        write(path, events)
+        written = time.perf_counter() - start
+        start = time.perf_counter()
+        read_back = sum(1 for _ in read(path))
+        read_time = time.perf_counter() - start
+        assert read_back == count
+        results[name] = {
+            "bytes": os.path.getsize(path),
+            "write_per_second": count / written,
+            "read_per_second": count / read_time,
+        }
+        os.remove(path)
+
+    # one block range out of the middle, archive only
+    path = os.path.join(directory, "events_benchmark.archive")
+    write_archive(path, events)
+    middle = events[count // 2].block
+    start = time.perf_counter()
+    with ArchiveReader(path) as reader:
+        found = sum(1 for _ in reader.events(middle, middle + 1_000))
+    results["archive"]["range_seconds"] = time.perf_counter() - start
+    results["archive"]["range_events"] = found
+    os.remove(path)
+    return results
+
+
+def print_benchmark(results, count):
+    print(f"{count:,} events")
+    print(f"{'format':<10}{'MB':>10}{'bytes/event':>13}{'write/s':>12}{'read/s':>12}")
+    for name, row in results.items():
+        print(
+            f"{name:<10}{row['bytes'] / 1e6:>10.1f}{row['bytes'] / count:>13.1f}"
+            f"{row['write_per_second']:>12,.0f}{row['read_per_second']:>12,.0f}"
+        )
+    archive = results["archive"]
+    print(
+        f"\nblock range read: {archive['range_events']:,} events"
+        f" in {archive['range_seconds'] * 1000:.1f}ms"
+    )
+
+
+def main(count=1_000_000):
+    count = int(count)
+    print_benchmark(benchmark(count), count)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--benchmark", type=int, default=1_000_000)
+    main(parser.parse_args().benchmark)
@@ -0,0 +1,102 @@
+"""
+Python wrapper around StakingRewardsLens, plus a latency benchmark against direct
+per-call reads.
+
+    brownie run lens main <registry> <account> --network <local node>
+"""
+import time
+from statistics import median
+
+from brownie import StakingRewards, StakingRewardsLens, accounts, interface
+from brownie.exceptions import VirtualMachineError
+
+FIELDS = (
+    "pool",
+    "stakingToken",
+    "rewardsToken",
+    "rewardRate",
+    "periodFinish",
+    "rewardsDuration",
+    "totalSupply",
+    "isRetired",
+    "pricePerShare",
+    "balance",
+    "earned",
+)
+
+
+def deploy_lens(registry, deployer=None):
+    deployer = deployer or accounts[0]
+    return deployer.deploy(StakingRewardsLens, registry)
+
+
+def read_pools(lens, account, pools=None):
+    """One eth_call for every pool, registry pools if none are given."""
+    if pools is None:
+        raw = lens.getAllPools(account)
+    else:
+        raw = lens.getPools(list(pools), account)
+    return [dict(zip(FIELDS, row)) for row in raw]
+
+
+def read_pools_direct(pools, account):
+    """The same data read the way frontends do it today, one call per field."""
+    info = []
+    for address in pools:
+        pool = StakingRewards.at(address)
+        staking_token = pool.stakingToken()
+        try:
+            price_per_share = interface.IVaultFactory045(staking_token).pricePerShare()
+        except VirtualMachineError:
+            price_per_share = 0
+        info.append(
+            {
+                "pool": str(address),
+                "stakingToken": staking_token,
+                "rewardsToken": pool.rewardsToken(),
+                "rewardRate": pool.rewardRate(),
+                "periodFinish": pool.periodFinish(),
+                "rewardsDuration": pool.rewardsDuration(),
+                "totalSupply": pool.totalSupply(),
+                "isRetired": pool.isRetired(),
+                "pricePerShare": price_per_share,
+                "balance": pool.balanceOf(account),
+                "earned": pool.earned(account),
+            }
+        )
+    return info
+
+
+def _time(fn, rounds):
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return median(samples)
+
+
+def benchmark(lens, account, pools=None, rounds=20):
+    """Median seconds per full page load, lens vs. per-call reads."""
+    pools = pools if pools is not None else lens.registeredPools()
+    assert read_pools(lens, account, pools) == read_pools_direct(pools, account)
+    lens_time = _time(lambda: read_pools(lens, account, pools), rounds)
+    direct_time = _time(lambda: read_pools_direct(pools, account), rounds)
+    return {
+        "pools": len(pools),
+        "lens_calls": 1,
+        "direct_calls": len(pools) * len(FIELDS),
+        "lens_seconds": lens_time,
+        "direct_seconds": direct_time,
+        "speedup": direct_time / lens_time if lens_time else float("inf"),
+    }
+
+
+def main(registry, account, rounds=20):
+    lens = deploy_lens(registry)
+    result = benchmark(lens, account, rounds=int(rounds))
+    print(
+        f"{result['pools']} pools: lens {result['lens_seconds'] * 1000:.1f}ms"
+        f" ({result['lens_calls']} call), direct {result['direct_seconds'] * 1000:.1f}ms"
+        f" ({result['direct_calls']} calls), {result['speedup']:.1f}x faster"
+    )
@@ -0,0 +1,425 @@
+"""
+Load generator for a burst of stakers on a local chain, e.g. an incentive launch.
+
+Deploys the local system, funds N deterministic accounts with mock underlying and
+vault shares, then fires zapIn/stake/getReward/withdraw at a target rate. The
+schedule is a seeded Poisson process, so the same seed replays the same workload.
+Transactions are signed locally and sent concurrently through AsyncRPC, each
+account keeping its own nonce, so the node sees real pipelined traffic instead of
+brownie's send-and-wait.
+
+Reported:
+    - submit -> receipt latency percentiles per action
+    - failed transactions (rejected, reverted or timed out) and why
+    - gas used and transactions per block
+    - rewardPerTokenStored at every block of the run
+
+Use `block_time` to batch transactions into blocks (evm_mine on an interval) rather
+than automining one block per transaction.
+
+    brownie run load_test main [users] [rate] [transactions] [seed] [block_time]
+"""
+import asyncio
+import hashlib
+import json
+import time
+from collections import defaultdict
+
+import numpy as np
+from brownie import accounts, chain, web3
+from eth_account import Account
+from eth_account.signers.local import LocalAccount
+from eth_utils import keccak
+
+from scripts.async_rpc import AsyncRPC, RPCError
+from scripts.local_system import deploy_local_system, fund_rewards
+
+ACTIONS = ("zapIn", "stake", "getReward", "withdraw")
+DEFAULT_MIX = (0.35, 0.3, 0.2, 0.15)
+GAS_LIMIT = 500_000
+FUNDING = 1_000 * 10**18
+PERCENTILES = (50, 90, 99)
+
+
+def load_accounts(count, seed):
+    """Deterministic local keys, so a seed always maps to the same addresses."""
+    return [
+        Account.from_key(keccak(text=f"load-test-{seed}-{i}")) for i in range(count)
+    ]
+
+
+def build_schedule(count, users, rate, seed, mix=DEFAULT_MIX, funding=FUNDING):
+    """
+    (offset seconds, user index, action, amount) for every transaction. Balances are
+    tracked as the schedule is built so stakes and withdrawals fit what each account
+    will actually hold.
+    """
+    rng = np.random.default_rng(seed)
+    offsets = np.cumsum(rng.exponential(1 / rate, count))
+    picks = rng.integers(0, users, count)
+    kinds = rng.choice(len(ACTIONS), count, p=mix)
+    fractions = rng.uniform(0.05, 0.5, count)
+
+    underlying = [funding] * users
+    shares = [funding] * users
+    staked = [0] * users
+    schedule = []
+    for offset, user, kind, fraction in zip(offsets, picks, kinds, fractions):
+        user, action = int(user), ACTIONS[kind]
+        available = {
+            "zapIn": underlying,
+            "stake": shares,
+            "withdraw": staked,
+        }.get(action)
+        amount = int(available[user] * float(fraction)) if available else 0
+        if available and amount == 0:
+            action = "getReward"
+        elif action == "zapIn":
+            underlying[user] -= amount
+            staked[user] += amount
+        elif action == "stake":
+            shares[user] -= amount
+            staked[user] += amount
+        elif action == "withdraw":
+            staked[user] -= amount
+            shares[user] += amount
+        schedule.append((float(offset), user, action, amount))
+    return schedule
+
+
+def eth_funding(schedule, users, gas_price):
+    """Wei each account needs to pay for its two approvals and scheduled transactions."""
+    counts = np.bincount([user for _, user, _, _ in schedule], minlength=users) + 2
+    return [int(count) * GAS_LIMIT * gas_price for count in counts]
+
+
+class Sender:
+    """
+    Sends transactions concurrently across accounts and waits for their receipts,
+    tracking each account's nonce locally.
+    """
+
+    def __init__(self, rpc, chain_id, gas_price, timeout=120, poll_interval=0.05):
+        self.rpc = rpc
+        self.chain_id = chain_id
+        self.gas_price = gas_price
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.nonces = {}
+        self._locks = defaultdict(asyncio.Lock)
+
+    async def _nonce(self, account):
+        if account.address not in self.nonces:
+            count = await self.rpc.request(
+                "eth_getTransactionCount", [account.address, "pending"]
+            )
+            self.nonces[account.address] = int(count, 16)
+        nonce = self.nonces[account.address]
+        self.nonces[account.address] += 1
+        return nonce
+
+    async def _submit(self, account, tx):
+        if isinstance(account, LocalAccount):
+            raw = bytes(account.sign_transaction(tx).rawTransaction)
+            return await self.rpc.request("eth_sendRawTransaction", ["0x" + raw.hex()])
+
+        # unlocked node account, e.g. gov on a dev chain
+        tx = {k: hex(v) if isinstance(v, int) else v for k, v in tx.items()}
+        del tx["chainId"]
+        tx["from"] = account.address
+        return await self.rpc.request("eth_sendTransaction", [tx])
+
+    async def send(self, account, to, data="0x", value=0, gas=GAS_LIMIT):
+        """Returns a record of the transaction, never raises for a failed one."""
+        record = {"sender": account.address, "submitted": time.perf_counter()}
+        tx = {
+            "to": str(to),
+            "data": data,
+            "value": value,
+            "gas": gas,
+            "gasPrice": self.gas_price,
+            "chainId": self.chain_id,
+        }
+
+        # one submission per account at a time, so nonces reach the node in order
+        async with self._locks[account.address]:
+            tx["nonce"] = await self._nonce(account)
+            try:
+                txid = await self._submit(account, tx)
+            except RPCError as exc:
+                # the nonce was never used, read it back from the node next time
+                del self.nonces[account.address]
+                record.update(status="rejected", error=str(exc))
+                return record
+
+        deadline = record["submitted"] + self.timeout
+        while time.perf_counter() < deadline:
+            receipt = await self.rpc.request("eth_getTransactionReceipt", [txid])
+            if receipt:
+                ok = int(receipt["status"], 16) == 1
+                record.update(
+                    txid=txid,
+                    status="ok" if ok else "reverted",
+                    latency=time.perf_counter() - record["submitted"],
+                    block=int(receipt["blockNumber"], 16),
+                    gas_used=int(receipt["gasUsed"], 16),
+                )
+                return record
+            await asyncio.sleep(self.poll_interval)
+        record.update(txid=txid, status="timeout")
+        return record
+
+
+async def _mine_every(rpc, block_time, stop):
+    while not stop.is_set():
+        await asyncio.sleep(block_time)
+        await rpc.request("evm_mine", [])
+
+
+async def _set_automine(rpc, enabled):
+    try:
+        await rpc.request("evm_setAutomine", [enabled])
+    except RPCError:
+        # ganache-cli 6
+        await rpc.request("miner_start" if enabled else "miner_stop", [])
+
+
+async def _fund(sender, system, gov, users, funding, eth):
+    """ETH, underlying and vault shares for every user, then their approvals."""
+    s = system
+    needed = sum(eth)
+    balance = await sender.rpc.request("eth_getBalance", [gov.address, "latest"])
+    if needed > int(balance, 16):
+        raise RuntimeError(
+            f"{gov} holds {int(balance, 16) / 1e18:,.4f} ETH,"
+            f" users need {needed / 1e18:,.4f} for gas"
+        )
+
+    gov_txs = []
+    for user, value in zip(users, eth):
+        if value:
+            gov_txs.append(sender.send(gov, user.address, value=value, gas=21_000))
+        gov_txs += [
+            sender.send(
+                gov,
+                s.underlying,
+                s.underlying.transfer.encode_input(user.address, funding),
+            ),
+            sender.send(
+                gov, s.vault, s.vault.deposit.encode_input(funding, user.address)
+            ),
+        ]
+    records = await asyncio.gather(*gov_txs)
+
+    user_txs = []
+    for user in users:
+        user_txs += [
+            sender.send(
+                user,
+                s.underlying,
+                s.underlying.approve.encode_input(s.zap, 2**256 - 1),
+            ),
+            sender.send(
+                user, s.vault, s.vault.approve.encode_input(s.pool, 2**256 - 1)
+            ),
+        ]
+    records += await asyncio.gather(*user_txs)
+    failed = [r for r in records if r["status"] != "ok"]
+    if failed:
+        raise RuntimeError(f"{len(failed)} funding transactions failed: {failed[0]}")
+
+
+async def _run(system, gov, users, schedule, max_in_flight, block_time):
+    s = system
+    calls = {
+        "zapIn": lambda amount: (s.zap, s.zap.zapIn.encode_input(s.vault, amount)),
+        "stake": lambda amount: (s.pool, s.pool.stake.encode_input(amount)),
+        "getReward": lambda amount: (s.pool, s.pool.getReward.encode_input()),
+        "withdraw": lambda amount: (s.pool, s.pool.withdraw.encode_input(amount)),
+    }
+    async with AsyncRPC(web3.provider.endpoint_uri, max_connections=32) as rpc:
+        sender = Sender(rpc, chain.id, web3.eth.gas_price)
+        eth = eth_funding(schedule, len(users), sender.gas_price)
+        await _fund(sender, s, gov, users, FUNDING, eth)
+
+        stop = asyncio.Event()
+        miner = None
+        if block_time:
+            await _set_automine(rpc, False)
+            miner = asyncio.ensure_future(_mine_every(rpc, block_time, stop))
+
+        first_block = chain.height + 1
+        limit = asyncio.Semaphore(max_in_flight)
+        start = time.perf_counter()
+
+        async def fire(offset, user, action, amount):
+            await asyncio.sleep(max(0, start + offset - time.perf_counter()))
+            async with limit:
+                to, data = calls[action](amount)
+                record = await sender.send(users[user], to, data)
+            record["action"] = action
+            return record
+
+        records = await asyncio.gather(*(fire(*item) for item in schedule))
+        elapsed = time.perf_counter() - start
+
+        if miner:
+            stop.set()
+            await miner
+            await _set_automine(rpc, True)
+
+        last_block = max(
+            [r["block"] for r in records if "block" in r], default=first_block
+        )
+        blocks = await asyncio.gather(
+            *(
+                rpc.request("eth_getBlockByNumber", [hex(b), False])
+                for b in range(first_block, last_block + 1)
+            )
+        )
+        stored = await asyncio.gather(
+            *(
+                rpc.call(s.pool.address, s.pool.rewardPerTokenStored.encode_input(), b)
+                for b in range(first_block, last_block + 1)
+            )
+        )
+    per_block = [
+        {
+            "block": int(block["number"], 16),
+            "timestamp": int(block["timestamp"], 16),
+            "gas_used": int(block["gasUsed"], 16),
+            "transactions": len(block["transactions"]),
+            "reward_per_token_stored": int.from_bytes(value, "big"),
+        }
+        for block, value in zip(blocks, stored)
+    ]
+    return records, per_block, elapsed
+
+
+def summarize(records, per_block, elapsed):
+    by_action = defaultdict(list)
+    for record in records:
+        by_action[record["action"]].append(record)
+
+    actions = {}
+    for action, group in sorted(by_action.items()):
+        latencies = np.array([r["latency"] for r in group if r["status"] == "ok"])
+        failures = defaultdict(int)
+        for r in group:
+            if r["status"] != "ok":
+                failures[r["status"]] += 1
+        actions[action] = {
+            "sent": len(group),
+            "ok": int(latencies.size),
+            "failed": dict(failures),
+            "latency_ms": {
+                f"p{p}": float(np.percentile(latencies, p) * 1000)
+                if latencies.size
+                else None
+                for p in PERCENTILES
+            },
+            "gas_mean": float(
+                np.mean([r["gas_used"] for r in group if "gas_used" in r] or [0])
+            ),
+        }
+
+    gas = np.array([b["gas_used"] for b in per_block] or [0])
+    return {
+        "transactions": len(records),
+        "seconds": elapsed,
+        "throughput": len(records) / elapsed if elapsed else 0,
+        "failed": sum(r["status"] != "ok" for r in records),
+        "errors": sorted({r["error"] for r in records if "error" in r})[:20],
+        "actions": actions,
+        "blocks": len(per_block),
+        "gas_per_block": {
+            "mean": float(gas.mean()),
+            "max": int(gas.max()),
+            "p90": float(np.percentile(gas, 90)),
+        },
+    }
+
+
+def run_load_test(
+    gov,
+    users=100,
+    rate=50.0,
+    transactions=1_000,
+    seed=0,
+    max_in_flight=256,
+    block_time=None,
+    reward=10_000 * 10**18,
+):
+    system = deploy_local_system(gov)
+    fund_rewards(system, system.pool, reward)
+    system.underlying.mint(gov, 2 * FUNDING * users, {"from": gov})
+    system.underlying.approve(system.vault, 2**256 - 1, {"from": gov})
+    keys = load_accounts(users, seed)
+    schedule = build_schedule(transactions, users, rate, seed)
+
+    records, per_block, elapsed = asyncio.run(
+        _run(system, gov, keys, schedule, max_in_flight, block_time)
+    )
+    digest = hashlib.sha256(json.dumps(schedule).encode()).hexdigest()
+    return {
+        "config": {
+            "users": users,
+            "rate": rate,
+            "transactions": transactions,
+            "seed": seed,
+            "max_in_flight": max_in_flight,
+            "block_time": block_time,
+            "schedule_sha256": digest,
+        },
+        "summary": summarize(records, per_block, elapsed),
+        "blocks": per_block,
+    }
+
+
+def print_report(report):
+    config, summary = report["config"], report["summary"]
+    print(
+        f"\n{summary['transactions']:,} transactions from {config['users']:,} accounts"
+        f" at {config['rate']}/s target, seed {config['seed']}"
+    )
+    print(
+        f"{summary['throughput']:.1f} tx/s over {summary['seconds']:.1f}s,"
+        f" {summary['failed']} failed, {summary['blocks']} blocks"
+    )
+    header = "".join(f"{'p' + str(p):>10}" for p in PERCENTILES)
+    print(f"\n{'action':<12}{'sent':>8}{'failed':>8}{header}{'gas':>10}")
+    for action, row in summary["actions"].items():
+        latency = "".join(
+            f"{row['latency_ms'][f'p{p}'] or 0:>8.0f}ms" for p in PERCENTILES
+        )
+        failed = sum(row["failed"].values())
+        print(
+            f"{action:<12}{row['sent']:>8}{failed:>8}{latency}{row['gas_mean']:>10,.0f}"
+        )
+    gas = summary["gas_per_block"]
+    print(
+        f"\ngas per block: mean {gas['mean']:,.0f}, p90 {gas['p90']:,.0f}, max {gas['max']:,}"
+    )
+    blocks = report["blocks"]
+    if blocks:
+        print(
+            f"rewardPerTokenStored: {blocks[0]['reward_per_token_stored']:,}"
+            f" -> {blocks[-1]['reward_per_token_stored']:,}"
+        )
+
+
+def main(
+    users=100, rate=50, transactions=1_000, seed=0, block_time=0, out="load_test.json"
+):
+    report = run_load_test(
+        accounts[0],
+        users=int(users),
+        rate=float(rate),
+        transactions=int(transactions),
+        seed=int(seed),
+        block_time=float(block_time) or None,
+    )
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print_report(report)
+    print(f"\nReport written to {out}")
@@ -0,0 +1,62 @@
+"""
+Deploy a self-contained registry, zap and staking pool on a local dev chain using
+mock tokens, so scripts don't depend on forked state.
+"""
+from types import SimpleNamespace
+
+from brownie import (
+    MockPermitToken,
+    MockVault,
+    StakingRewards,
+    StakingRewardsRegistry,
+    StakingRewardsZap,
+)
+
+
+def deploy_local_system(gov, decimals=18):
+    underlying = gov.deploy(MockPermitToken, "Mock DAI", "mDAI", decimals)
+    reward = gov.deploy(MockPermitToken, "Mock OP", "mOP", 18)
+    vault = gov.deploy(MockVault, underlying)
+    registry = gov.deploy(StakingRewardsRegistry)
+    zap = gov.deploy(StakingRewardsZap, registry)
+    registry.setPoolEndorsers(gov, True, {"from": gov})
+    registry.setApprovedPoolOwner(gov, True, {"from": gov})
+    system = SimpleNamespace(
+        gov=gov,
+        underlying=underlying,
+        reward=reward,
+        vault=vault,
+        registry=registry,
+        zap=zap,
+    )
+    system.pool = deploy_pool(system, vault)
+    return system
+
+
+def deploy_pool(system, vault, replace=False):
+    """Deploy a pool for `vault` with our mock reward token and register it."""
+    gov = system.gov
+    pool = gov.deploy(StakingRewards, gov, gov, system.reward, vault, system.zap)
+    system.registry.addStakingPool(pool, vault, replace, {"from": gov})
+    return pool
+
+
+def fund_rewards(system, pool, amount):
+    """Mint reward tokens to `pool` and start a new reward period."""
+    system.reward.mint(pool, amount, {"from": system.gov})
+    return pool.notifyRewardAmount(amount, {"from": system.gov})
+
+
+def fund_staker(system, user, amount, pools=(), zap_amount=0):
+    """
+    Give `user` `amount` vault tokens approved for each of `pools`, plus `zap_amount`
+    underlying approved for the zap.
+    """
+    gov = system.gov
+    system.underlying.mint(user, amount + zap_amount, {"from": gov})
+    system.underlying.approve(system.vault, 2**256 - 1, {"from": user})
+    if zap_amount:
+        system.underlying.approve(system.zap, 2**256 - 1, {"from": user})
+    system.vault.deposit(amount, user, {"from": user})
+    for pool in pools:
+        system.vault.approve(pool, 2**256 - 1, {"from": user})
@@ -0,0 +1,287 @@
+"""
+Merkle distributor payout for retired or migrated pools.
+
+Outstanding earned() balances are snapshotted off-chain by replaying the pool's
+events through the contract math (CheckpointIndex), and paid out through a
+StakingRewardsDistributor that users claim from with a proof, instead of everyone
+calling getReward on the pool.
+
+The tree is built level by level on disk, streaming each level from the one below
+in fixed-size chunks, so memory stays flat whatever the number of leaves. Leaves
+and pair hashing match OpenZeppelin's MerkleProof: double-hashed abi.encode(index,
+account, amount) leaves, sorted pairs, and an unpaired last node moves up a level
+as is.
+
+Only retired pools are paid out this way. On a live pool stakers could still call
+getReward() and be paid twice.
+
+    brownie run merkle main <pool> <deployer or account id> [from_block] [deadline_days]
+    python -m scripts.merkle --benchmark 1000000
+"""
+import argparse
+import csv
+import json
+import os
+import resource
+import tempfile
+import time
+from pathlib import Path
+
+from eth_utils import keccak, to_checksum_address
+
+from scripts.checkpoints import CheckpointIndex
+
+NODE = 32
+CHUNK = 1 << 16  # nodes per read, must be even
+
+
+def leaf_hash(index, account, amount):
+    encoded = (
+        index.to_bytes(32, "big")
+        + bytes.fromhex(str(account)[2:]).rjust(32, b"\0")
+        + amount.to_bytes(32, "big")
+    )
+    return keccak(keccak(encoded))
+
+
+def hash_pair(a, b):
+    return keccak(a + b if a < b else b + a)
+
+
+def verify(proof, root, leaf):
+    node = leaf
+    for sibling in proof:
+        node = hash_pair(node, sibling)
+    return node == root
+
+
+class MerkleTree:
+    """
+    A tree stored in `directory`: claims.csv with the (account, amount) of every
+    leaf, and one file of 32 byte nodes per level, level 0 being the leaves.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        with open(self.directory / "tree.json") as f:
+            meta = json.load(f)
+        self.sizes = meta["sizes"]
+        self.total = meta["total"]
+        self._files = [open(self._level(i), "rb") for i in range(len(self.sizes))]
+        self.root = self._read(len(self.sizes) - 1, 0, 1)
+
+    def _level(self, level):
+        return self.directory / f"level{level}.bin"
+
+    def _read(self, level, start, count):
+        return os.pread(self._files[level].fileno(), count * NODE, start * NODE)
+
+    def __len__(self):
+        return self.sizes[0]
+
+    @classmethod
+    def build(cls, claims, directory):
+        """Build from (account, amount) pairs in the order they should be indexed."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        count = total = 0
+        with open(directory / "claims.csv", "w", newline="") as c, open(
+            directory / "level0.bin", "wb"
+        ) as leaves:
+            writer = csv.writer(c)
+            for account, amount in claims:
+                writer.writerow((account, amount))
+                leaves.write(leaf_hash(count, account, amount))
+                count += 1
+                total += amount
+        if count == 0:
+            raise ValueError("Nothing to distribute")
+
+        sizes = [count]
+        while sizes[-1] > 1:
+            level = len(sizes) - 1
+            with open(directory / f"level{level}.bin", "rb") as src, open(
+                directory / f"level{level + 1}.bin", "wb"
+            ) as dst:
+                while True:
+                    data = src.read(CHUNK * NODE)
+                    if not data:
+                        break
+                    nodes = [data[i : i + NODE] for i in range(0, len(data), NODE)]
+                    parents = [
+                        hash_pair(nodes[i], nodes[i + 1])
+                        for i in range(0, len(nodes) - 1, 2)
+                    ]
+                    if len(nodes) % 2:
+                        parents.append(nodes[-1])
+                    dst.write(b"".join(parents))
+            sizes.append((sizes[-1] + 1) // 2)
+
+        with open(directory / "tree.json", "w") as f:
+            json.dump({"sizes": sizes, "total": total}, f)
+        return cls(directory)
+
+    def proof(self, index):
+        proof = []
+        for level, size in enumerate(self.sizes[:-1]):
+            sibling = index ^ 1
+            if sibling < size:
+                proof.append(self._read(level, sibling, 1))
+            index >>= 1
+        return proof
+
+    def proofs(self, block=CHUNK):
+        """
+        Proof for every leaf, in order. Leaves are handled in aligned blocks of a
+        power of two: below that height siblings sit in one slice per level, above it
+        the whole block shares the same siblings.
+        """
+        depth = min(block.bit_length() - 1, len(self.sizes) - 1)
+        for start in range(0, len(self), block):
+            slices = []
+            for level in range(depth):
+                first = start >> level
+                slices.append((first, self._read(level, first, block >> level)))
+
+            shared, node = [], start >> depth
+            for level in range(depth, len(self.sizes) - 1):
+                if node ^ 1 < self.sizes[level]:
+                    shared.append(self._read(level, node ^ 1, 1))
+                node >>= 1
+
+            for index in range(start, min(start + block, len(self))):
+                proof, node = [], index
+                for level, (first, data) in enumerate(slices):
+                    sibling = node ^ 1
+                    if sibling < self.sizes[level]:
+                        offset = (sibling - first) * NODE
+                        proof.append(data[offset : offset + NODE])
+                    node >>= 1
+                yield proof + shared
+
+    def claims(self):
+        """Every claim with its proof, as the distributor expects them."""
+        with open(self.directory / "claims.csv", newline="") as f:
+            rows = csv.reader(f)
+            for index, ((account, amount), proof) in enumerate(
+                zip(rows, self.proofs())
+            ):
+                yield {
+                    "index": index,
+                    "account": account,
+                    "amount": int(amount),
+                    "proof": ["0x" + p.hex() for p in proof],
+                }
+
+    def write_claims(self, path):
+        """Claims as JSON lines, for a frontend or claim bot to look up."""
+        with open(path, "w") as f:
+            for claim in self.claims():
+                f.write(json.dumps(claim) + "\n")
+
+    def close(self):
+        for f in self._files:
+            f.close()
+
+
+def snapshot(events, rewards_token=None):
+    """
+    (account, earned) for every account with something owed, sorted by account, from
+    a retired pool's events replayed through the contract math. earned() reads zero
+    once the pool is swept, so balances are taken from the model right before the
+    sweep's Recovered event, in event order. A getReward in the same block, or at the
+    same timestamp, is already paid and not owed again.
+    """
+    index = CheckpointIndex(rewards_token=rewards_token)
+    for event in events:
+        if event.name == "Recovered" and event.account == rewards_token:
+            model = index.model
+            owed = ((a, model.earned(a, event.timestamp)) for a in sorted(index.users))
+            return [(account, amount) for account, amount in owed if amount]
+        index.apply(event)
+    raise ValueError("Pool isn't retired, stakers can still claim from it")
+
+
+def deploy_distributor(owner, pool, tree, deadline):
+    from brownie import StakingRewardsDistributor
+
+    if not pool.isRetired():
+        raise ValueError(f"{pool} isn't retired, stakers can still claim from it")
+    return owner.deploy(
+        StakingRewardsDistributor, pool.rewardsToken(), pool, tree.root, deadline
+    )
+
+
+def _fake_claims(count):
+    for i in range(count):
+        account = to_checksum_address(keccak(i.to_bytes(8, "big"))[-20:])
+        yield account, (i * 7919 % 10**6 + 1) * 10**12
+
+
+def benchmark(count=1_000_000, directory=None):
+    directory = directory or tempfile.mkdtemp()
+    start = time.perf_counter()
+    tree = MerkleTree.build(_fake_claims(count), directory)
+    built = time.perf_counter() - start
+
+    start = time.perf_counter()
+    proofs = 0
+    for proof in tree.proofs():
+        proofs += 1
+    all_proofs = time.perf_counter() - start
+
+    index = count // 3
+    account, amount = list(_fake_claims(index + 1))[-1]
+    proof = tree.proof(index)
+    assert verify(proof, tree.root, leaf_hash(index, account, amount))
+    size = sum(p.stat().st_size for p in Path(directory).iterdir())
+    tree.close()
+    return {
+        "leaves": count,
+        "build_seconds": built,
+        "proof_seconds": all_proofs,
+        "depth": len(proof),
+        "disk_bytes": size,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main(pool=None, deployer=None, from_block=0, deadline_days=180, benchmark_size=0):
+    if benchmark_size:
+        result = benchmark(int(benchmark_size))
+        print(
+            f"{result['leaves']:,} leaves: tree built in {result['build_seconds']:.1f}s,"
+            f" all proofs in {result['proof_seconds']:.1f}s (depth {result['depth']}),"
+            f" {result['disk_bytes'] / 1e6:.0f}MB on disk,"
+            f" peak RSS {result['peak_rss_mb']:.0f}MB"
+        )
+        return
+
+    from brownie import StakingRewards, chain
+
+    from scripts.checkpoints import events_from_chain
+    from scripts.cli import load_account
+
+    deployer = load_account(deployer)
+    pool = StakingRewards.at(pool)
+    if not pool.isRetired():
+        raise ValueError(f"{pool} isn't retired, stakers can still claim from it")
+    now = chain[-1].timestamp
+    events = events_from_chain(pool, int(from_block))
+    directory = Path("merkle") / pool.address
+    tree = MerkleTree.build(snapshot(events, pool.rewardsToken()), directory)
+    distributor = deploy_distributor(
+        deployer, pool, tree, now + int(deadline_days) * 86400
+    )
+    tree.write_claims(directory / "claims.jsonl")
+    print(
+        f"{len(tree):,} claims totalling {tree.total / 1e18:,.4f}, root 0x{tree.root.hex()}"
+    )
+    print(f"Distributor at {distributor}, fund it with {tree.total} rewardsToken")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--benchmark", type=int, default=1_000_000)
+    main(benchmark_size=parser.parse_args().benchmark)
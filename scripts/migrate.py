@@ -0,0 +1,333 @@
+"""
+Move every staker from a replaced pool to its replacement in batched transactions.
+
+Once the old pool's owner calls setMigration(new pool, migrator) and the new pool's
+owner calls setMigrationSource(old pool), staking in the old pool closes. Once
+MIGRATION_DELAY has passed, giving stakers time to exit if they don't want to move,
+the migrator can call migrate() on the old pool with a list of accounts. Each
+account's staked balance and pending rewards are moved to the new pool in the same
+transaction, instead of every staker sending exit, approve and stake themselves.
+
+The planner lists stakers from the old pool's events, reads their positions with
+concurrent batched eth_calls, and splits them into batches that fit a fraction of
+the block gas limit, using eth_estimateGas. Batches are sent back to back with
+consecutive nonces, then totals are reconciled against both pools.
+
+With no arguments, benchmarks batched migration against exit-and-restake on a local
+dev chain.
+
+    brownie run migrate --network development
+    brownie run migrate main <old pool> <new pool> <migrator or account id> [execute]
+"""
+import asyncio
+import math
+
+from brownie import StakingRewards, accounts, chain, web3
+from brownie.exceptions import VirtualMachineError
+from eth_utils import keccak
+
+from scripts.async_rpc import BALANCE_OF, AsyncRPC, earned_many, read_uint
+from scripts.cli import load_account
+from scripts.local_system import deploy_local_system, deploy_pool, fund_rewards
+from scripts.sweep import stakers
+
+GAS_FILL = 0.8  # fraction of the block gas limit a batch may use
+PROBE = 20  # accounts in the estimate used to size batches
+
+
+async def _positions(url, pool, accounts):
+    async with AsyncRPC(url) as rpc:
+        balances, earned = await asyncio.gather(
+            asyncio.gather(*(read_uint(rpc, pool, BALANCE_OF, a) for a in accounts)),
+            earned_many(rpc, pool, accounts),
+        )
+    return dict(zip(accounts, balances)), dict(zip(accounts, earned))
+
+
+def positions(pool, accounts):
+    """(balanceOf, earned) for every account, as account -> value dicts."""
+    return asyncio.run(
+        _positions(web3.provider.endpoint_uri, str(pool), [str(a) for a in accounts])
+    )
+
+
+def size_batches(accounts, estimate, budget, probe=PROBE):
+    """
+    Split `accounts` into batches whose estimated gas fits `budget`. The cost per
+    account is measured from an estimate of one account and one of `probe`, then
+    every batch is estimated again and trimmed until it fits, since accounts that are
+    new to the target pool cost more than ones already staked there.
+
+    Returns (batches, gas estimate of each batch).
+    """
+    if not accounts:
+        return [], []
+    first = estimate(accounts[:1])
+    if first > budget:
+        raise ValueError(f"one account needs {first} gas, over the {budget} budget")
+    sample = accounts[:probe]
+    if len(sample) > 1:
+        per_account = max(1, math.ceil((estimate(sample) - first) / (len(sample) - 1)))
+    else:
+        per_account = first
+    size = max(1, (budget - first) // per_account + 1)
+
+    batches, gas = [], []
+    start = 0
+    while start < len(accounts):
+        batch = accounts[start : start + size]
+        used = estimate(batch)
+        while used > budget and len(batch) > 1:
+            batch = batch[: min(len(batch) - 1, len(batch) * budget // used)]
+            used = estimate(batch)
+        batches.append(batch)
+        gas.append(used)
+        start += len(batch)
+    return batches, gas
+
+
+def plan_migration(old, new, migrator, from_block=0, gas_limit=None, fill=GAS_FILL):
+    """
+    Batches for every account with a balance or pending rewards in `old`, plus what
+    each account holds in both pools now, for reconcile().
+    """
+    if old.migrationTarget() != new.address:
+        raise ValueError(f"{old} isn't migrating to {new}, call setMigration first")
+    if old.migrator() != migrator.address:
+        raise ValueError(f"{migrator} isn't the migrator of {old}")
+    if new.migrationSource() != old.address:
+        raise ValueError(f"{new} doesn't accept {old}, call setMigrationSource first")
+    if chain.time() < old.migrationStart():
+        raise ValueError(f"{old} can't migrate before {old.migrationStart()}")
+
+    listed = stakers(old, from_block)
+    balances, earned = positions(old, listed)
+    listed = [a for a in listed if balances[a] or earned[a]]
+    gas_limit = gas_limit or web3.eth.get_block("latest").gasLimit
+    budget = int(gas_limit * fill)
+    batches, gas = size_batches(
+        listed, lambda b: old.migrate.estimate_gas(b, {"from": migrator}), budget
+    )
+    return {
+        "old": old,
+        "new": new,
+        "migrator": migrator,
+        "accounts": listed,
+        "balances": balances,
+        "earned": earned,
+        "new_balances": positions(new, listed)[0],
+        "new_total": new.totalSupply(),
+        "gas_limit": gas_limit,
+        "budget": budget,
+        "batches": batches,
+        "gas": gas,
+    }
+
+
+def submit_batches(plan):
+    """
+    Send every batch with consecutive nonces before waiting on any of them. Returns
+    a receipt (or the exception it raised) per batch.
+    """
+    old, migrator = plan["old"], plan["migrator"]
+    nonce = migrator.nonce
+    pending = []
+    for batch, gas in zip(plan["batches"], plan["gas"]):
+        try:
+            tx = old.migrate(
+                batch,
+                {
+                    "from": migrator,
+                    "nonce": nonce,
+                    "gas_limit": min(int(gas * 1.2), plan["gas_limit"]),
+                    "required_confs": 0,
+                },
+            )
+            nonce += 1
+        except VirtualMachineError as exc:
+            tx = exc
+        pending.append(tx)
+    for tx in pending:
+        if not isinstance(tx, VirtualMachineError):
+            tx.wait(1)
+    return pending
+
+
+def reconcile(plan, receipts):
+    """
+    Check the migrated amounts against the plan and both pools. Earned rewards keep
+    accruing between planning and migrating, so moved rewards can only be higher.
+    """
+    old, new = plan["old"], plan["new"]
+    moved, rewards = {}, {}
+    failed = gas_used = 0
+    for tx in receipts:
+        if isinstance(tx, VirtualMachineError) or tx.status != 1:
+            failed += 1
+            continue
+        gas_used += tx.gas_used
+        for name, totals, key in (
+            ("MigratedOut", moved, "amount"),
+            ("RewardMigrated", rewards, "reward"),
+        ):
+            if name in tx.events:
+                for event in tx.events[name]:
+                    totals[event["user"]] = totals.get(event["user"], 0) + event[key]
+
+    listed = plan["accounts"]
+    old_balances, old_earned = positions(old, listed)
+    new_balances = positions(new, listed)[0]
+    mismatched = [
+        a
+        for a in listed
+        if a not in moved
+        or old_balances[a]
+        or old_earned[a]
+        or moved[a] != plan["balances"][a]
+        or new_balances[a] != plan["new_balances"][a] + moved[a]
+        or rewards.get(a, 0) < plan["earned"][a]
+    ]
+    staked = sum(moved.values())
+    result = {
+        "accounts": len(listed),
+        "migrated": len(moved),
+        "batches": len(receipts),
+        "failed": failed,
+        "staked": staked,
+        "planned_staked": sum(plan["balances"].values()),
+        "rewards": sum(rewards.values()),
+        "planned_rewards": sum(plan["earned"].values()),
+        "new_total_increase": new.totalSupply() - plan["new_total"],
+        "mismatched": mismatched,
+        "gas_used": gas_used,
+    }
+    result["ok"] = (
+        not failed and not mismatched and result["new_total_increase"] == staked
+    )
+    return result
+
+
+# benchmark
+
+
+def _bench_accounts(count):
+    return [
+        accounts.add("0x" + keccak(text=f"migrate-{i}").hex()) for i in range(count)
+    ]
+
+
+def _seed_stakers(system, pool, users, amount):
+    """Stake `amount` for every user, through stakeFor so users need no setup txs."""
+    gov, total = system.gov, amount * len(users)
+    system.underlying.mint(gov, total, {"from": gov})
+    system.underlying.approve(system.vault, total, {"from": gov})
+    system.vault.deposit(total, gov, {"from": gov})
+    system.vault.approve(pool, total, {"from": gov})
+    pool.setZapContract(gov, {"from": gov})
+    for user in users:
+        pool.stakeFor(user, amount, {"from": gov})
+    pool.setZapContract(system.zap, {"from": gov})
+
+
+def _replaced_pool(gov, users, amount):
+    system = deploy_local_system(gov)
+    old = system.pool
+    _seed_stakers(system, old, users, amount)
+    fund_rewards(system, old, 1_000 * 10**18)
+    chain.sleep(86400)
+    chain.mine(1)
+    return system, old, deploy_pool(system, system.vault, True)
+
+
+def benchmark(gov, users=200, fill=GAS_FILL, amount=10**20):
+    """Gas and transactions to move `users` stakers, batched vs one by one."""
+    users = _bench_accounts(users)
+    for user in users:
+        accounts[0].transfer(user, 10**17)
+
+    # every staker exits and stakes again in the new pool themselves
+    system, old, new = _replaced_pool(gov, users, amount)
+    txs = []
+    for user in users:
+        txs.append(old.exit({"from": user}))
+        txs.append(system.vault.approve(new, amount, {"from": user}))
+        txs.append(new.stake(amount, {"from": user}))
+    manual = {
+        "transactions": len(txs),
+        "gas": sum(tx.gas_used for tx in txs),
+    }
+
+    # the migrator moves everyone in batches
+    start = chain.height
+    system, old, new = _replaced_pool(gov, users, amount)
+    setup = [
+        old.setMigration(new, gov, {"from": gov}),
+        new.setMigrationSource(old, {"from": gov}),
+    ]
+    chain.sleep(old.MIGRATION_DELAY())
+    chain.mine(1)
+    plan = plan_migration(old, new, gov, start, fill=fill)
+    result = reconcile(plan, submit_batches(plan))
+    if not result["ok"]:
+        raise AssertionError(f"migration didn't reconcile: {result}")
+    batched = {
+        "transactions": len(setup) + result["batches"],
+        "gas": sum(tx.gas_used for tx in setup) + result["gas_used"],
+        "accounts_per_batch": max(len(b) for b in plan["batches"]),
+        "block_gas_limit": plan["gas_limit"],
+    }
+    for row in (manual, batched):
+        row["gas_per_account"] = row["gas"] / len(users)
+    return {"users": len(users), "exit_and_restake": manual, "migration": batched}
+
+
+def print_migration(plan, result=None):
+    print(
+        f"{len(plan['accounts'])} accounts holding {sum(plan['balances'].values()) / 1e18:,.4f}"
+        f" staked and {sum(plan['earned'].values()) / 1e18:,.4f} rewards,"
+        f" {len(plan['batches'])} batches of up to"
+        f" {max((len(b) for b in plan['batches']), default=0)}"
+        f" ({plan['budget']:,} gas budget per batch)"
+    )
+    if result:
+        status = "reconciled" if result["ok"] else "DID NOT RECONCILE"
+        print(
+            f"Migrated {result['migrated']}/{result['accounts']} accounts in"
+            f" {result['batches']} transactions ({result['failed']} failed),"
+            f" {result['staked'] / 1e18:,.4f} staked and"
+            f" {result['rewards'] / 1e18:,.4f} rewards, {result['gas_used']:,} gas:"
+            f" {status}"
+        )
+        for account in result["mismatched"]:
+            print(f"  mismatch: {account}")
+
+
+def print_benchmark(results):
+    print(f"\nMoving {results['users']} stakers to a replacement pool")
+    print(f"{'':<20}{'txs':>8}{'gas':>14}{'gas/account':>14}")
+    for name in ("exit_and_restake", "migration"):
+        row = results[name]
+        print(
+            f"{name:<20}{row['transactions']:>8}{row['gas']:>14,}"
+            f"{row['gas_per_account']:>14,.0f}"
+        )
+    batched = results["migration"]
+    print(
+        f"\n{batched['accounts_per_batch']} accounts per migrate() within"
+        f" {GAS_FILL:.0%} of a {batched['block_gas_limit']:,} gas block"
+    )
+
+
+def main(old=None, new=None, migrator=None, execute=False, from_block=0):
+    if old is None:
+        print_benchmark(benchmark(accounts[0]))
+        return
+
+    migrator = load_account(migrator)
+    old, new = StakingRewards.at(old), StakingRewards.at(new)
+    plan = plan_migration(old, new, migrator, int(from_block))
+    result = None
+    if str(execute).lower() in ("1", "true", "yes"):
+        result = reconcile(plan, submit_batches(plan))
+    print_migration(plan, result)
+    return plan, result
@@ -0,0 +1,218 @@
+"""
+Monte Carlo simulator for StakingRewards pool dilution and reward-rate outcomes.
+
+Each path simulates one pool over a fixed horizon: retail stakers arrive and leave
+as Poisson processes, a whale may enter and exit, and governance tops up rewards on
+a jittered schedule (so notifyRewardAmount often rolls over mid-period). A tracked
+user stakes a fixed amount the whole time, which gives us the per-user APR.
+
+Paths are simulated in vectorized numpy batches, and batches are spread across a
+ProcessPoolExecutor. Every batch gets its own child of one SeedSequence, so results
+are identical for a given seed no matter how many workers are used.
+
+    brownie run monte_carlo
+    python scripts/monte_carlo.py --paths 100000 --seed 1
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+
+import numpy as np
+
+DAY = 86400
+YEAR = 365 * DAY
+PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+
+
+@dataclass(frozen=True)
+class PoolScenario:
+    # horizon and resolution, in seconds
+    horizon: int = 90 * DAY
+    step: int = 3600
+    rewards_duration: int = 7 * DAY
+
+    # reward top-ups, in reward token wei
+    top_up_amount: float = 100e18
+    top_up_interval: int = 7 * DAY
+    top_up_jitter: int = 2 * DAY
+    top_up_skip_probability: float = 0.05
+
+    # staking token amounts are in wei, all sizes are lognormal medians
+    initial_supply: float = 1_000e18
+    stake_arrivals_per_day: float = 20.0
+    stake_size: float = 50e18
+    withdraw_arrivals_per_day: float = 15.0
+    withdraw_size: float = 50e18
+    size_sigma: float = 1.0
+
+    # a single whale may enter once and stay for an exponential time
+    whale_probability: float = 0.3
+    whale_size: float = 10_000e18
+    whale_mean_stay: int = 14 * DAY
+
+    # our tracked user, and reward token value in staking token terms
+    user_stake: float = 100e18
+    reward_price: float = 1.0
+
+
+def _poisson_sizes(rng, counts, median, sigma):
+    # sum a variable number of lognormal draws per path without a python loop
+    total = int(counts.sum())
+    if total == 0:
+        return np.zeros(counts.shape)
+    sizes = rng.lognormal(np.log(median), sigma, total)
+    owner = np.repeat(np.arange(counts.size), counts)
+    return np.bincount(owner, weights=sizes, minlength=counts.size)
+
+
+def simulate_batch(scenario, seed_sequence, paths):
+    """Simulate `paths` independent pools, returning per-path result arrays."""
+    s = scenario
+    rng = np.random.default_rng(seed_sequence)
+    step_days = s.step / DAY
+
+    base_supply = np.full(paths, s.initial_supply)
+    whale_enters = rng.random(paths) < s.whale_probability
+    whale_in = np.where(whale_enters, rng.uniform(0, s.horizon, paths), np.inf)
+    whale_out = whale_in + rng.exponential(s.whale_mean_stay, paths)
+
+    reward_rate = np.zeros(paths)
+    period_finish = np.zeros(paths)
+    next_top_up = np.zeros(paths)
+
+    user_earned = np.zeros(paths)
+    emitted = np.zeros(paths)
+    notified = np.zeros(paths)
+    rollovers = np.zeros(paths, dtype=np.int64)
+    leftover_total = np.zeros(paths)
+    leftover_max = np.zeros(paths)
+    min_supply = np.full(paths, np.inf)
+
+    for t in range(0, s.horizon, s.step):
+        # reward top-ups due this step, leftover is rolled into the new rate
+        due = next_top_up <= t
+        if due.any():
+            notify = due & (rng.random(paths) >= s.top_up_skip_probability)
+            leftover = np.where(
+                notify & (t < period_finish), (period_finish - t) * reward_rate, 0.0
+            )
+            reward_rate = np.where(
+                notify,
+                np.floor((s.top_up_amount + leftover) / s.rewards_duration),
+                reward_rate,
+            )
+            period_finish = np.where(notify, t + s.rewards_duration, period_finish)
+            notified += np.where(notify, s.top_up_amount, 0.0)
+            rolled = leftover > 0
+            rollovers += rolled
+            leftover_total += leftover
+            leftover_max = np.maximum(leftover_max, leftover)
+            jitter = rng.uniform(-s.top_up_jitter, s.top_up_jitter, paths)
+            next_top_up = np.where(
+                due, next_top_up + s.top_up_interval + jitter, next_top_up
+            )
+
+        # retail flows, withdrawals can't take more than retail has staked
+        arrivals = rng.poisson(s.stake_arrivals_per_day * step_days, paths)
+        exits = rng.poisson(s.withdraw_arrivals_per_day * step_days, paths)
+        base_supply += _poisson_sizes(rng, arrivals, s.stake_size, s.size_sigma)
+        base_supply -= np.minimum(
+            _poisson_sizes(rng, exits, s.withdraw_size, s.size_sigma), base_supply
+        )
+
+        whale_active = (whale_in <= t) & (t < whale_out)
+        supply = base_supply + np.where(whale_active, s.whale_size, 0.0)
+        supply += s.user_stake
+        min_supply = np.minimum(min_supply, supply)
+
+        # emissions for this step, split pro-rata like rewardPerToken()
+        active_time = np.clip(period_finish - t, 0, s.step)
+        step_emitted = reward_rate * active_time
+        emitted += step_emitted
+        user_earned += np.where(
+            supply > 0, step_emitted * s.user_stake / np.maximum(supply, 1), 0.0
+        )
+
+    unemitted = reward_rate * np.clip(period_finish - s.horizon, 0, None)
+    apr = user_earned * s.reward_price / s.user_stake * YEAR / s.horizon
+    return {
+        "apr": apr,
+        "user_earned": user_earned,
+        "emitted": emitted,
+        "notified": notified,
+        "unemitted": unemitted,
+        "rollovers": rollovers,
+        "leftover_total": leftover_total,
+        "leftover_max": leftover_max,
+        "min_supply": min_supply,
+        "whale_entered": whale_enters & (whale_in < s.horizon),
+    }
+
+
+def _run_batch(args):
+    scenario, seed_sequence, paths = args
+    return simulate_batch(scenario, seed_sequence, paths)
+
+
+def run(scenario, paths=100_000, seed=0, batch_size=5_000, workers=None):
+    """Run `paths` simulations across a process pool and return merged arrays."""
+    batches = [batch_size] * (paths // batch_size)
+    if paths % batch_size:
+        batches.append(paths % batch_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(batches))
+    jobs = [(scenario, seeds[i], size) for i, size in enumerate(batches)]
+
+    if workers == 1:
+        results = [_run_batch(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_run_batch, jobs))
+
+    return {key: np.concatenate([r[key] for r in results]) for key in results[0]}
+
+
+def summarize(results):
+    """Percentile table for the headline metrics, in whole-token units."""
+    summary = {}
+    for key, scale in (
+        ("apr", 1),
+        ("user_earned", 1e18),
+        ("unemitted", 1e18),
+        ("leftover_total", 1e18),
+        ("leftover_max", 1e18),
+        ("min_supply", 1e18),
+    ):
+        values = results[key] / scale
+        summary[key] = dict(zip(PERCENTILES, np.percentile(values, PERCENTILES)))
+        summary[key]["mean"] = float(values.mean())
+    summary["rollovers_mean"] = float(results["rollovers"].mean())
+    summary["whale_share"] = float(results["whale_entered"].mean())
+    return summary
+
+
+def print_summary(summary):
+    header = "".join(f"{'p' + str(p):>12}" for p in PERCENTILES)
+    print(f"{'metric':<16}{header}{'mean':>12}")
+    for key, row in summary.items():
+        if not isinstance(row, dict):
+            continue
+        cells = "".join(f"{row[p]:>12.4f}" for p in PERCENTILES)
+        print(f"{key:<16}{cells}{row['mean']:>12.4f}")
+    print(f"\nMean mid-period rollovers per path: {summary['rollovers_mean']:.2f}")
+    print(f"Share of paths with a whale entry: {summary['whale_share']:.2%}")
+
+
+def main(paths=100_000, seed=0, workers=None):
+    scenario = PoolScenario()
+    print("Scenario:", asdict(scenario))
+    results = run(scenario, paths=int(paths), seed=int(seed), workers=workers)
+    print_summary(summarize(results))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--paths", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    main(args.paths, args.seed, args.workers)
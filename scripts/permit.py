@@ -0,0 +1,111 @@
+"""
+EIP-2612 permit signing, plus a gas and latency comparison of the two-transaction
+(approve, then stake/zap) and one-transaction (permit) flows on a local chain.
+
+    brownie run permit --network development
+"""
+import time
+
+from brownie import accounts
+from eth_keys import keys
+from eth_utils import keccak, to_bytes
+
+from scripts.local_system import deploy_local_system, fund_staker
+
+PERMIT_TYPEHASH = keccak(
+    text="Permit(address owner,address spender,uint256 value,uint256 nonce,uint256 deadline)"
+)
+
+
+def _word(value):
+    if isinstance(value, int):
+        return value.to_bytes(32, "big")
+    return to_bytes(hexstr=str(value)).rjust(32, b"\0")
+
+
+def permit_digest(token, owner, spender, value, deadline):
+    struct_hash = keccak(
+        PERMIT_TYPEHASH
+        + _word(owner)
+        + _word(spender)
+        + _word(int(value))
+        + _word(int(token.nonces(owner)))
+        + _word(int(deadline))
+    )
+    return keccak(b"\x19\x01" + bytes(token.DOMAIN_SEPARATOR()) + struct_hash)
+
+
+def sign_permit(token, owner, spender, value, deadline):
+    """Sign a permit for `owner` (a brownie LocalAccount), returns (v, r, s)."""
+    digest = permit_digest(token, owner.address, spender, value, deadline)
+    signature = keys.PrivateKey(to_bytes(hexstr=owner.private_key)).sign_msg_hash(
+        digest
+    )
+    return signature.v + 27, _word(signature.r), _word(signature.s)
+
+
+def pack_signature(v, r, s):
+    """Yearn vaults take one bytes signature, packed as r, s, v."""
+    return r + s + bytes([v])
+
+
+def _flow(name, txs, elapsed):
+    return {
+        "flow": name,
+        "transactions": len(txs),
+        "gas": sum(tx.gas_used for tx in txs),
+        "seconds": elapsed,
+    }
+
+
+def compare_stake(pool, vault, user, amount):
+    """Run both staking flows for `user`, who must hold 2 * amount of vault tokens."""
+    start = time.perf_counter()
+    approve = vault.approve(pool, amount, {"from": user})
+    stake = pool.stake(amount, {"from": user})
+    two_tx = _flow("approve + stake", [approve, stake], time.perf_counter() - start)
+
+    start = time.perf_counter()
+    deadline = 2**256 - 1
+    signature = pack_signature(
+        *sign_permit(vault, user, pool.address, amount, deadline)
+    )
+    permit = pool.stakeWithPermit(amount, deadline, signature, {"from": user})
+    one_tx = _flow("stakeWithPermit", [permit], time.perf_counter() - start)
+    return two_tx, one_tx
+
+
+def compare_zap(zap, vault, underlying, user, amount):
+    """Run both zap flows for `user`, who must hold 2 * amount of underlying."""
+    start = time.perf_counter()
+    approve = underlying.approve(zap, amount, {"from": user})
+    zap_in = zap.zapIn(vault, amount, {"from": user})
+    two_tx = _flow("approve + zapIn", [approve, zap_in], time.perf_counter() - start)
+
+    start = time.perf_counter()
+    deadline = 2**256 - 1
+    v, r, s = sign_permit(underlying, user, zap.address, amount, deadline)
+    permit = zap.zapInWithPermit(vault, amount, deadline, v, r, s, {"from": user})
+    one_tx = _flow("zapInWithPermit", [permit], time.perf_counter() - start)
+    return two_tx, one_tx
+
+
+def main():
+    gov = accounts[0]
+    user = accounts.add()
+    gov.transfer(user, "1 ether")
+    amount = 1_000 * 10**18
+
+    s = deploy_local_system(gov)
+
+    # zap first so our user ends up holding vault tokens for the direct stake flows
+    s.underlying.mint(user, 2 * amount, {"from": gov})
+    results = list(compare_zap(s.zap, s.vault, s.underlying, user, amount))
+    fund_staker(s, user, 2 * amount)
+    results += compare_stake(s.pool, s.vault, user, amount)
+
+    print(f"{'flow':<20}{'txs':>5}{'gas':>10}{'seconds':>10}")
+    for r in results:
+        print(
+            f"{r['flow']:<20}{r['transactions']:>5}{r['gas']:>10}{r['seconds']:>10.3f}"
+        )
@@ -0,0 +1,214 @@
+"""
+Rounding-dust analyzer for the StakingRewards integer math.
+
+Two truncations happen on every reward period:
+    notifyRewardAmount: rewardRate = reward / rewardsDuration
+    rewardPerToken():   increment = dt * rewardRate * 1e18 / totalSupply
+and earned() truncates again per user. This sweeps token decimals, supply, reward
+size, update frequency and user share over a full grid, computing the exact integer
+results (numpy object arrays, so uint256 math stays exact) for every combination.
+
+The output is one long-format row per combination, ready to pivot into heatmaps.
+
+    brownie run precision_analyzer
+    python -m scripts.precision_analyzer --out dust.csv
+"""
+import argparse
+import csv
+import time
+
+import numpy as np
+
+from scripts.reward_math import DEFAULT_DURATION, PRECISION
+
+# yvUSDC vs yvDAI style staking tokens, and 6 or 18 decimal reward tokens
+STAKING_DECIMALS = (6, 18)
+REWARD_DECIMALS = (6, 18)
+
+# whole-token amounts and seconds between updateReward() calls
+SUPPLY_TOKENS = np.logspace(0, 9, 46)
+REWARD_TOKENS = np.logspace(0, 7, 36)
+UPDATE_INTERVALS = np.unique(
+    np.logspace(0, np.log10(DEFAULT_DURATION), 40).astype(int)
+).tolist()
+USER_SHARES_PPM = (1, 10, 100, 1_000, 10_000, 100_000, 1_000_000)
+
+COLUMNS = (
+    "staking_decimals",
+    "reward_decimals",
+    "supply",
+    "reward",
+    "update_interval",
+    "user_share_ppm",
+    "notify_dust",
+    "reward_per_token_dust",
+    "undistributed_share",
+    "zero_increment",
+    "user_loss",
+    "user_loss_share",
+)
+
+
+def _as_wei(tokens, decimals):
+    return np.array([int(round(t * 10**decimals)) for t in tokens], dtype=object)
+
+
+def build_grid(
+    staking_decimals=STAKING_DECIMALS,
+    reward_decimals=REWARD_DECIMALS,
+    supply_tokens=SUPPLY_TOKENS,
+    reward_tokens=REWARD_TOKENS,
+    update_intervals=UPDATE_INTERVALS,
+    user_shares_ppm=USER_SHARES_PPM,
+):
+    """Cartesian product of all axes as flat arrays, amounts converted to wei."""
+    axes = [
+        np.arange(len(staking_decimals)),
+        np.arange(len(reward_decimals)),
+        np.arange(len(supply_tokens)),
+        np.arange(len(reward_tokens)),
+        np.arange(len(update_intervals)),
+        np.arange(len(user_shares_ppm)),
+    ]
+    index = [a.ravel() for a in np.meshgrid(*axes, indexing="ij")]
+
+    staking_dec = np.array(staking_decimals)[index[0]]
+    reward_dec = np.array(reward_decimals)[index[1]]
+
+    # wei lookup tables per decimals value, then gather (keeps python ints exact)
+    supply_wei = {d: _as_wei(supply_tokens, d) for d in staking_decimals}
+    reward_wei = {d: _as_wei(reward_tokens, d) for d in reward_decimals}
+    supply = np.empty(index[2].size, dtype=object)
+    reward = np.empty(index[3].size, dtype=object)
+    for d, table in supply_wei.items():
+        mask = staking_dec == d
+        supply[mask] = table[index[2][mask]]
+    for d, table in reward_wei.items():
+        mask = reward_dec == d
+        reward[mask] = table[index[3][mask]]
+
+    return {
+        "staking_decimals": staking_dec,
+        "reward_decimals": reward_dec,
+        "supply": supply,
+        "reward": reward,
+        "update_interval": np.array(update_intervals, dtype=object)[index[4]],
+        "user_share_ppm": np.array(user_shares_ppm, dtype=object)[index[5]],
+    }
+
+
+def analyze(grid, duration=DEFAULT_DURATION):
+    """
+    Exact dust for one reward period of `duration` seconds with a constant supply,
+    where updateReward() runs every `update_interval` seconds and our worst-case
+    user is touched on every one of those updates.
+    """
+    supply = grid["supply"]
+    reward = grid["reward"]
+    dt = grid["update_interval"]
+
+    # notifyRewardAmount truncation
+    rate = reward // duration
+    notify_dust = reward - rate * duration
+
+    # rewardPerToken truncation over full intervals plus the final partial one
+    full_updates = duration // dt
+    tail = duration - full_updates * dt
+    increment = dt * rate * PRECISION // supply
+    tail_increment = tail * rate * PRECISION // supply
+    total_increment = full_updates * increment + tail_increment
+    emitted_scaled = rate * duration * PRECISION
+    rpt_dust = (emitted_scaled - total_increment * supply) / PRECISION
+
+    # earned() truncation for a user holding user_share_ppm of the supply
+    balance = supply * grid["user_share_ppm"] // 1_000_000
+    user_actual = (
+        full_updates * (balance * increment // PRECISION)
+        + balance * tail_increment // PRECISION
+    )
+    user_ideal = (rate * duration * balance / supply).astype(float)
+    user_loss = (rate * duration * balance - user_actual * supply) / supply
+
+    reward_float = reward.astype(float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        undistributed_share = np.where(
+            reward_float > 0,
+            (notify_dust.astype(float) + rpt_dust.astype(float)) / reward_float,
+            0.0,
+        )
+        user_loss_share = np.where(
+            user_ideal > 0, user_loss.astype(float) / user_ideal, 0.0
+        )
+
+    table = dict(grid)
+    table.update(
+        {
+            "notify_dust": notify_dust,
+            "reward_per_token_dust": rpt_dust.astype(float),
+            "undistributed_share": undistributed_share,
+            "zero_increment": (increment == 0) & (rate > 0),
+            "user_loss": user_loss.astype(float),
+            "user_loss_share": user_loss_share,
+        }
+    )
+    return table
+
+
+def pivot(table, row, column, metric, **filters):
+    """2D max-aggregated slice of the table, e.g. supply x update_interval."""
+    mask = np.ones(table[metric].size, dtype=bool)
+    for key, value in filters.items():
+        mask &= table[key] == value
+    rows = sorted(set(table[row][mask]))
+    columns = sorted(set(table[column][mask]))
+    row_index = {v: i for i, v in enumerate(rows)}
+    column_index = {v: i for i, v in enumerate(columns)}
+    grid = np.full((len(rows), len(columns)), np.nan)
+    for r, c, v in zip(table[row][mask], table[column][mask], table[metric][mask]):
+        i, j = row_index[r], column_index[c]
+        grid[i, j] = v if np.isnan(grid[i, j]) else max(grid[i, j], v)
+    return rows, columns, grid
+
+
+def write_csv(table, path):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        writer.writerows(zip(*(table[c] for c in COLUMNS)))
+
+
+def print_summary(table):
+    rows = table["supply"].size
+    print(f"Combinations analyzed: {rows:,}")
+    for staking in STAKING_DECIMALS:
+        for reward in REWARD_DECIMALS:
+            mask = (table["staking_decimals"] == staking) & (
+                table["reward_decimals"] == reward
+            )
+            share = table["undistributed_share"][mask]
+            worst = table["user_loss"][mask]
+            zero = table["zero_increment"][mask]
+            print(
+                f"staking {staking:>2} dec / reward {reward:>2} dec:"
+                f" worst undistributed {share.max():.2e} of rewards,"
+                f" worst user loss {worst.max():.3e} wei,"
+                f" zero-increment combos {zero.mean():.2%}"
+            )
+
+
+def main(out="precision_dust.csv"):
+    start = time.perf_counter()
+    table = analyze(build_grid())
+    elapsed = time.perf_counter() - start
+    print_summary(table)
+    print(f"Analyzed in {elapsed:.1f}s")
+    if out:
+        write_csv(table, out)
+        print(f"Wrote {out}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--out", default="precision_dust.csv")
+    args = parser.parse_args()
+    main(args.out)
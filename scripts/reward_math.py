@@ -0,0 +1,157 @@
+"""
+Off-chain model of the StakingRewards reward math.
+
+Everything here mirrors contracts/StakingRewards.sol using exact integer math, so
+results (including rounding) match what the contract would return at the same
+timestamps. Revert strings are raised as ValueError with the contract's message.
+"""
+
+PRECISION = 10**18
+SWEEP_DELAY = 90 * 86400
+DEFAULT_DURATION = 7 * 86400
+
+
+def reward_per_token(stored, last_update, last_applicable, rate, total_supply):
+    if total_supply == 0:
+        return stored
+    return stored + (last_applicable - last_update) * rate * PRECISION // total_supply
+
+
+def earned(balance, reward_per_token_now, user_paid, rewards):
+    return balance * (reward_per_token_now - user_paid) // PRECISION + rewards
+
+
+class StakingRewardsModel:
+    def __init__(self, rewards_duration=DEFAULT_DURATION):
+        self.rewards_duration = rewards_duration
+        self.period_finish = 0
+        self.reward_rate = 0
+        self.last_update_time = 0
+        self.reward_per_token_stored = 0
+        self.is_retired = False
+        self.total_supply = 0
+        self.reward_balance = 0
+        self.balances = {}
+        self.user_reward_per_token_paid = {}
+        self.rewards = {}
+
+    # views
+
+    def last_time_reward_applicable(self, timestamp):
+        return min(timestamp, self.period_finish)
+
+    def reward_per_token(self, timestamp):
+        if self.total_supply == 0:
+            return self.reward_per_token_stored
+        if self.is_retired:
+            return 0
+        return reward_per_token(
+            self.reward_per_token_stored,
+            self.last_update_time,
+            self.last_time_reward_applicable(timestamp),
+            self.reward_rate,
+            self.total_supply,
+        )
+
+    def earned(self, account, timestamp):
+        if self.is_retired:
+            return 0
+        return earned(
+            self.balances.get(account, 0),
+            self.reward_per_token(timestamp),
+            self.user_reward_per_token_paid.get(account, 0),
+            self.rewards.get(account, 0),
+        )
+
+    def get_reward_for_duration(self):
+        return self.reward_rate * self.rewards_duration
+
+    # mutative
+
+    def update_reward(self, account, timestamp):
+        self.reward_per_token_stored = self.reward_per_token(timestamp)
+        self.last_update_time = self.last_time_reward_applicable(timestamp)
+        if account is not None:
+            self.rewards[account] = self.earned(account, timestamp)
+            self.user_reward_per_token_paid[account] = self.reward_per_token_stored
+
+    def stake(self, account, amount, timestamp):
+        # check first, a revert would roll back the reward update too
+        if amount == 0:
+            raise ValueError("Cannot stake 0")
+        if self.is_retired:
+            raise ValueError("Staking pool is retired")
+        self.update_reward(account, timestamp)
+        self.total_supply += amount
+        self.balances[account] = self.balances.get(account, 0) + amount
+
+    def withdraw(self, account, amount, timestamp):
+        if amount == 0:
+            raise ValueError("Cannot withdraw 0")
+        if amount > self.balances.get(account, 0):
+            raise ValueError("SafeMath: subtraction overflow")
+        self.update_reward(account, timestamp)
+        self.total_supply -= amount
+        self.balances[account] -= amount
+
+    def get_reward(self, account, timestamp):
+        self.update_reward(account, timestamp)
+        reward = self.rewards.get(account, 0)
+        if reward > 0:
+            self.rewards[account] = 0
+            self.reward_balance -= reward
+        return reward
+
+    def exit(self, account, timestamp):
+        self.withdraw(account, self.balances.get(account, 0), timestamp)
+        return self.get_reward(account, timestamp)
+
+    def migrate_out(self, account, timestamp):
+        """migrate() for one account, returns the (balance, reward) moved out."""
+        self.update_reward(account, timestamp)
+        amount = self.balances.get(account, 0)
+        reward = self.rewards.get(account, 0)
+        self.balances[account] = 0
+        self.rewards[account] = 0
+        self.total_supply -= amount
+        self.reward_balance -= reward
+        return amount, reward
+
+    def migrate_in(self, account, amount, reward, timestamp):
+        """acceptMigration() for one account."""
+        if self.is_retired:
+            raise ValueError("Staking pool is retired")
+        self.update_reward(account, timestamp)
+        self.total_supply += amount
+        self.balances[account] = self.balances.get(account, 0) + amount
+        self.rewards[account] += reward
+        self.reward_balance += reward
+
+    def notify_reward_amount(self, reward, timestamp, check_balance=True):
+        """
+        Returns the leftover (undistributed) amount rolled into the new period. Skip
+        the balance check when replaying events, where the balance isn't known.
+        """
+        leftover = 0
+        if timestamp >= self.period_finish:
+            new_rate = reward // self.rewards_duration
+        else:
+            leftover = (self.period_finish - timestamp) * self.reward_rate
+            new_rate = (reward + leftover) // self.rewards_duration
+
+        if check_balance and new_rate > self.reward_balance // self.rewards_duration:
+            raise ValueError("Provided reward too high")
+
+        self.update_reward(None, timestamp)
+        self.reward_rate = new_rate
+        self.last_update_time = timestamp
+        self.period_finish = timestamp + self.rewards_duration
+        return leftover
+
+    def recover_rewards(self, timestamp):
+        if timestamp <= self.period_finish + SWEEP_DELAY:
+            raise ValueError("wait 90 days to sweep leftover rewards")
+        swept = self.reward_balance
+        self.reward_balance = 0
+        self.is_retired = True
+        return swept
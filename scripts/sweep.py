@@ -0,0 +1,223 @@
+"""
+Find end-of-life staking pools and sweep their leftover rewards in one run.
+
+A pool can have its rewardsToken swept (which retires it) once 90 days have passed
+since periodFinish. We list every pool the registry has ever added, read their state
+in pages through StakingRewardsLens, and look up the stakers of eligible pools and
+what they'd lose (earned() is zeroed on retirement) with concurrent batched
+eth_calls. Sweeps are then sent back to back with consecutive nonces, without
+waiting on each confirmation, and the swept amounts are reconciled against unclaimed
+rewards in a CSV report.
+
+Eligible pools the sender doesn't own are reported as such but not swept. Nothing
+is sent unless `execute` is set.
+
+    brownie run sweep main <registry> <sender or account id> [lens] [execute]
+"""
+import asyncio
+import csv
+from datetime import datetime, timezone
+
+from brownie import ZERO_ADDRESS, StakingRewards, chain, interface, web3
+from brownie.exceptions import VirtualMachineError
+
+from scripts.async_rpc import AsyncRPC, earned_many
+from scripts.cli import load_account
+from scripts.lens import deploy_lens, read_pools
+from scripts.reward_math import SWEEP_DELAY
+
+PAGE_SIZE = 100
+COLUMNS = (
+    "pool",
+    "rewardsToken",
+    "periodFinish",
+    "owner",
+    "stakers",
+    "unclaimed",
+    "balance",
+    "swept",
+    "undistributed",
+    "status",
+)
+
+
+def registry_pools(registry, lens, from_block=0):
+    """Current pools plus every pool the registry ever replaced, in order added."""
+    pools = [
+        log.args.stakingPool
+        for log in registry.events.StakingPoolAdded.get_sequence(
+            from_block, chain.height
+        )
+    ]
+    pools += lens.registeredPools()
+    return list(dict.fromkeys(pools))
+
+
+def read_pool_states(lens, pools, page_size=PAGE_SIZE):
+    states = []
+    for i in range(0, len(pools), page_size):
+        states += read_pools(lens, ZERO_ADDRESS, pools[i : i + page_size])
+    return states
+
+
+def eligible(states, now):
+    """Pools whose rewards can be swept, never-funded pools are left alone."""
+    return [
+        s
+        for s in states
+        if not s["isRetired"]
+        and s["periodFinish"] > 0
+        and now > s["periodFinish"] + SWEEP_DELAY
+    ]
+
+
+def stakers(pool, from_block=0):
+    accounts = []
+    for name in ("Staked", "StakedFor", "MigratedIn"):
+        for log in getattr(pool.events, name).get_sequence(from_block, chain.height):
+            accounts.append(log.args.user)
+    return list(dict.fromkeys(accounts))
+
+
+async def _unclaimed(url, plans):
+    async with AsyncRPC(url) as rpc:
+        earned = await asyncio.gather(
+            *(earned_many(rpc, p["pool"], p["stakers"]) for p in plans)
+        )
+    return [sum(e) for e in earned]
+
+
+def plan_sweeps(states, sender, from_block=0):
+    """
+    One plan per eligible pool, with stakers and what they're owed. Pools `sender`
+    doesn't own are kept (with owned=False) so they still show up in the report.
+    """
+    plans = []
+    for state in eligible(states, chain[-1].timestamp):
+        pool = StakingRewards.at(state["pool"])
+        owner = pool.owner()
+        reward = interface.IERC20(state["rewardsToken"])
+        plans.append(
+            {
+                "pool": state["pool"],
+                "rewardsToken": state["rewardsToken"],
+                "periodFinish": state["periodFinish"],
+                "owner": owner,
+                "owned": owner == sender,
+                "stakers": stakers(pool, from_block),
+                "balance": reward.balanceOf(state["pool"]),
+            }
+        )
+
+    unclaimed = asyncio.run(_unclaimed(web3.provider.endpoint_uri, plans))
+    for plan, amount in zip(plans, unclaimed):
+        plan["unclaimed"] = amount
+    return plans
+
+
+def submit_sweeps(plans, sender):
+    """
+    Send every sweep `sender` can make with consecutive nonces before waiting on any
+    of them, then collect receipts. Returns pool -> receipt (or the exception it
+    raised).
+    """
+    nonce = sender.nonce
+    pending = {}
+    for plan in plans:
+        if not plan["owned"]:
+            continue
+        pool = StakingRewards.at(plan["pool"])
+        try:
+            pending[plan["pool"]] = pool.recoverERC20(
+                plan["rewardsToken"],
+                0,
+                {"from": sender, "nonce": nonce, "required_confs": 0},
+            )
+            nonce += 1
+        except VirtualMachineError as exc:
+            pending[plan["pool"]] = exc
+    for tx in pending.values():
+        if not isinstance(tx, VirtualMachineError):
+            tx.wait(1)
+    return pending
+
+
+def reconcile(plans, receipts=None):
+    rows = []
+    receipts = receipts or {}
+    for plan in plans:
+        row = {c: plan.get(c) for c in COLUMNS}
+        row["stakers"] = len(plan["stakers"])
+        tx = receipts.get(plan["pool"])
+        if not plan["owned"]:
+            row["swept"], row["status"] = 0, "not owner"
+        elif tx is None:
+            row["swept"], row["status"] = 0, "planned"
+        elif isinstance(tx, VirtualMachineError) or tx.status != 1:
+            row["swept"], row["status"] = 0, "failed"
+        else:
+            row["swept"] = sum(e["amount"] for e in tx.events["Recovered"])
+            row["status"] = "swept"
+
+        # what was swept beyond users' unclaimed rewards was never distributed
+        amount = row["swept"] if row["status"] == "swept" else plan["balance"]
+        row["undistributed"] = amount - plan["unclaimed"]
+        rows.append(row)
+    return rows
+
+
+def write_report(rows, path):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def print_report(rows, scanned):
+    swept = [r for r in rows if r["status"] == "swept"]
+    others = [r for r in rows if r["status"] == "not owner"]
+    print(
+        f"{scanned} pools scanned, {len(rows)} eligible for sweeping,"
+        f" {len(others)} of them owned by someone else"
+    )
+    for row in rows:
+        finished = datetime.fromtimestamp(row["periodFinish"], timezone.utc).date()
+        print(
+            f"{row['pool']}  ended {finished}  {row['status']:<8}"
+            f"  swept {row['swept'] / 1e18:>14,.4f}"
+            f"  unclaimed {row['unclaimed'] / 1e18:>14,.4f}"
+            f"  ({row['stakers']} stakers)"
+            + (f"  owner {row['owner']}" if row["status"] == "not owner" else "")
+        )
+    if swept:
+        total = sum(r["swept"] for r in swept)
+        unclaimed = sum(r["unclaimed"] for r in swept)
+        print(
+            f"\nSwept {total / 1e18:,.4f} from {len(swept)} pools,"
+            f" {unclaimed / 1e18:,.4f} of it was unclaimed by stakers"
+        )
+
+
+def main(
+    registry,
+    sender,
+    lens=None,
+    execute=False,
+    from_block=0,
+    out="sweep_report.csv",
+):
+    from brownie import StakingRewardsLens, StakingRewardsRegistry
+
+    registry = StakingRewardsRegistry.at(registry)
+    sender = load_account(sender)
+    execute = str(execute).lower() in ("1", "true", "yes")
+    lens = StakingRewardsLens.at(lens) if lens else deploy_lens(registry, sender)
+
+    pools = registry_pools(registry, lens, int(from_block))
+    plans = plan_sweeps(read_pool_states(lens, pools), sender, int(from_block))
+    receipts = submit_sweeps(plans, sender) if execute and plans else None
+    rows = reconcile(plans, receipts)
+    write_report(rows, out)
+    print_report(rows, len(pools))
+    print(f"\nReport written to {out}")
+    return rows
@@ -0,0 +1,269 @@
+"""
+Per-call gas and storage-access tracing for the staking contracts.
+
+Replays stake, withdraw, getReward, exit, zapIn and addStakingPool on a local dev
+chain (or traces given transaction hashes), pulls each debug_traceTransaction via
+brownie's enriched trace, and attributes every opcode's gas to the source line and
+enclosing function or modifier (updateReward, nonReentrant, notPaused, SafeMath,
+_checkAllowance, ...). SLOAD/SSTORE are counted per storage slot as cold or warm
+(EIP-2929, first touch of an address/slot pair in a transaction is cold).
+
+Writes one folded-stack file per transaction (feed to flamegraph.pl or speedscope)
+and prints a summary table.
+
+    brownie run trace_gas --network development
+    brownie run trace_gas main <txid> <txid> ...
+"""
+import bisect
+import re
+from collections import defaultdict
+from pathlib import Path
+
+from brownie import MockVault, StakingRewards, accounts, chain
+from eth_utils import keccak
+
+from scripts.local_system import deploy_local_system, fund_rewards, fund_staker
+
+CALL_OPS = {"CALL", "CALLCODE", "DELEGATECALL", "STATICCALL", "CREATE", "CREATE2"}
+STORAGE_OPS = {"SLOAD", "SSTORE"}
+MAPPING_SLOTS = 64
+
+DEFINITION = re.compile(rb"\b(contract|library|interface|function|modifier)\s+(\w+)")
+COMMENT = re.compile(rb"//[^\n]*|/\*.*?\*/", re.S)
+
+
+class SourceIndex:
+    """Maps solc source offsets to a line number and enclosing function/modifier."""
+
+    def __init__(self, roots=None):
+        self.roots = roots or [Path("."), Path.home() / ".brownie" / "packages"]
+        self._files = {}
+
+    def _load(self, filename):
+        if filename in self._files:
+            return self._files[filename]
+        parsed = None
+        for root in self.roots:
+            path = root / filename
+            if path.is_file():
+                parsed = self._parse(path.read_bytes())
+                break
+        self._files[filename] = parsed
+        return parsed
+
+    def _parse(self, source):
+        # blank out comments without moving offsets, so braces in natspec don't count
+        code = COMMENT.sub(lambda m: b" " * len(m.group()), source)
+        line_starts = [0] + [m.end() for m in re.finditer(rb"\n", source)]
+
+        containers, regions = [], []
+        for match in DEFINITION.finditer(code):
+            kind, name = match.group(1).decode(), match.group(2).decode()
+            body = re.compile(rb"[{;]").search(code, match.end())
+            if body is None or body.group() == b";":
+                continue
+            depth, end = 0, body.start()
+            for end in range(body.start(), len(code)):
+                depth += {ord("{"): 1, ord("}"): -1}.get(code[end], 0)
+                if depth == 0:
+                    break
+            if kind in ("contract", "library", "interface"):
+                containers.append((match.start(), end, name))
+            else:
+                regions.append((match.start(), end, kind, name))
+
+        labelled = []
+        for start, end, kind, name in regions:
+            owner = next(
+                (c for s, e, c in reversed(containers) if s <= start <= e), "?"
+            )
+            label = f"{owner}.{name}"
+            labelled.append(
+                (start, end, label + " [modifier]" if kind == "modifier" else label)
+            )
+        return line_starts, labelled
+
+    def locate(self, source):
+        """(region label, 'File.sol:line') for a brownie trace step source."""
+        if not source:
+            return None, None
+        filename, (start, _) = source["filename"], source["offset"]
+        parsed = self._load(filename)
+        if parsed is None:
+            return None, f"{Path(filename).name}"
+        line_starts, regions = parsed
+        line = bisect.bisect_right(line_starts, start)
+        inner = [r for r in regions if r[0] <= start <= r[1]]
+        region = max(inner, key=lambda r: r[0])[2] if inner else None
+        return region, f"{Path(filename).name}:{line}"
+
+
+def step_costs(trace):
+    """
+    Gas used by each step itself. Geth reports the gas forwarded to a sub-call as the
+    CALL's cost, so for those we take the gas actually consumed across the call and
+    subtract what the child's own steps used.
+    """
+    costs = [step["gasCost"] for step in trace]
+    returns = {}
+    open_calls = []
+    for i, step in enumerate(trace):
+        while open_calls and step["depth"] <= trace[open_calls[-1]]["depth"]:
+            returns[open_calls.pop()] = i
+        entering = i + 1 < len(trace) and trace[i + 1]["depth"] > step["depth"]
+        if step["op"] in CALL_OPS and entering:
+            open_calls.append(i)
+
+    for i in sorted(returns, reverse=True):
+        j = returns[i]
+        consumed = trace[i]["gas"] - trace[j]["gas"]
+        costs[i] = consumed - sum(costs[i + 1 : j])
+    return costs
+
+
+def intrinsic_gas(data):
+    """Base cost of a call transaction, 21000 plus calldata (EIP-2028)."""
+    data = bytes.fromhex(data[2:]) if isinstance(data, str) else bytes(data)
+    return 21_000 + sum(16 if byte else 4 for byte in data)
+
+
+def _word(value):
+    if isinstance(value, int):
+        return value.to_bytes(32, "big")
+    return bytes.fromhex(str(value)[2:].rjust(64, "0"))
+
+
+def slot_labels(addresses):
+    """keccak slot -> readable label for mapping entries keyed by known addresses."""
+    labels = {}
+    for address in addresses:
+        for n in range(MAPPING_SLOTS):
+            slot = int.from_bytes(keccak(_word(address) + _word(n)), "big")
+            labels[slot] = f"map[{n}][{address[:8]}]"
+            for inner in addresses:
+                nested = int.from_bytes(keccak(_word(inner) + _word(slot)), "big")
+                labels[nested] = f"map[{n}][{address[:8]}][{inner[:8]}]"
+    return labels
+
+
+def trace_transaction(tx, label, index=None):
+    """Attribute gas and storage access for one transaction."""
+    index = index or SourceIndex()
+    trace = tx.trace
+    costs = step_costs(trace)
+
+    addresses = {tx.sender.address if hasattr(tx.sender, "address") else tx.sender}
+    addresses |= {step["address"] for step in trace if step.get("address")}
+    labels = slot_labels(sorted(addresses))
+
+    folded = defaultdict(int)
+    regions = defaultdict(int)
+    storage = defaultdict(lambda: defaultdict(int))
+    touched = set()
+    frames = []
+    base_depth = trace[0]["depth"] if trace else 0
+    last_depth = -1
+
+    for step, cost in zip(trace, costs):
+        # call stack by depth, using the function brownie resolved on entry
+        depth = step["depth"] - base_depth
+        del frames[depth if depth > last_depth else depth + 1 :]
+        last_depth = depth
+        while len(frames) <= depth:
+            frames.append(step.get("fn") or step.get("contractName") or "?")
+
+        region, line = index.locate(step.get("source"))
+        region = region or step.get("fn") or "?"
+        stack = [label] + frames
+        if region != frames[-1]:
+            stack.append(region)
+        if line:
+            stack.append(line)
+        folded[";".join(stack)] += cost
+        regions[region] += cost
+
+        if step["op"] in STORAGE_OPS:
+            slot = int(step["stack"][-1], 16)
+            key = (step.get("address"), slot)
+            warmth = "warm" if key in touched else "cold"
+            touched.add(key)
+            name = labels.get(slot, f"slot {slot}" if slot < 2**16 else hex(slot))
+            row = storage[(step.get("contractName") or step.get("address"), name)]
+            row[f"{step['op']} {warmth}"] += 1
+            row["gas"] += cost
+
+    # intrinsic gas, calldata and refunds never show up as steps
+    folded[f"{label};[intrinsic and refunds]"] += tx.gas_used - sum(costs)
+    return {
+        "label": label,
+        "gas_used": tx.gas_used,
+        "folded": dict(folded),
+        "regions": dict(regions),
+        "storage": {k: dict(v) for k, v in storage.items()},
+    }
+
+
+def write_folded(result, out_dir):
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir / f"{result['label']}.folded"
+    with path.open("w") as f:
+        for stack, gas in sorted(result["folded"].items()):
+            if gas > 0:
+                f.write(f"{stack} {gas}\n")
+    return path
+
+
+def print_summary(result, top=12):
+    print(f"\n=== {result['label']}: {result['gas_used']:,} gas ===")
+    print(f"{'function / modifier':<48}{'gas':>10}")
+    ranked = sorted(result["regions"].items(), key=lambda r: -r[1])
+    for region, gas in ranked[:top]:
+        print(f"{region:<48}{gas:>10,}")
+
+    columns = ("SLOAD cold", "SLOAD warm", "SSTORE cold", "SSTORE warm", "gas")
+    print(f"\n{'contract':<24}{'slot':<32}" + "".join(f"{c:>13}" for c in columns))
+    for (contract, slot), row in sorted(
+        result["storage"].items(), key=lambda r: -r[1]["gas"]
+    ):
+        cells = "".join(f"{row.get(c, 0):>13,}" for c in columns)
+        print(f"{str(contract):<24}{slot:<32}{cells}")
+
+
+def replay_scenario(gov, user):
+    """Run every hot-path call once on a fresh local system, returns label -> tx."""
+    s = deploy_local_system(gov)
+    amount = 100 * 10**18
+    fund_staker(s, user, 2 * amount, [s.pool], zap_amount=amount)
+
+    txs = {"stake": s.pool.stake(amount, {"from": user})}
+    fund_rewards(s, s.pool, 100 * 10**18)
+    chain.sleep(3600)
+    chain.mine(1)
+    txs["getReward"] = s.pool.getReward({"from": user})
+    txs["withdraw"] = s.pool.withdraw(amount // 2, {"from": user})
+    txs["zapIn"] = s.zap.zapIn(s.vault, amount, {"from": user})
+    chain.sleep(3600)
+    chain.mine(1)
+    txs["exit"] = s.pool.exit({"from": user})
+
+    new_vault = gov.deploy(MockVault, s.underlying)
+    new_pool = gov.deploy(StakingRewards, gov, gov, s.reward, new_vault, s.zap)
+    txs["addStakingPool"] = s.registry.addStakingPool(
+        new_pool, new_vault, False, {"from": gov}
+    )
+    return txs
+
+
+def main(*txids, out_dir="gas_traces"):
+    if txids:
+        txs = {txid[:10]: chain.get_transaction(txid) for txid in txids}
+    else:
+        txs = replay_scenario(accounts[0], accounts[1])
+
+    index = SourceIndex()
+    for label, tx in txs.items():
+        result = trace_transaction(tx, label, index)
+        path = write_folded(result, out_dir)
+        print_summary(result)
+        print(f"\nFlamegraph stacks written to {path}")
@@ -0,0 +1,305 @@
+"""
+Pool TVL in underlying terms, totalSupply() times the staking vault's pricePerShare,
+charted for every registry pool, replaced ones included, from local data.
+
+totalSupply() only changes on Staked/StakedFor/Withdrawn and the migration events
+MigratedIn/MigratedOut, so it is rebuilt from pool events as a step function,
+anchored by one historical call at the first block. Pools and vaults deployed inside
+the chart window read as zero before their deployment block.
+
+pricePerShare is cached per vault as a delta-encoded, compressed series on disk with
+an LRU-bounded in-memory layer on top. Vault profit unlocks linearly after a harvest,
+so between samples we interpolate, and sample every harvest (StrategyReported) plus a
+coarse block grid. Gaps are found for a whole chart at once and fetched in one go, so
+a 12-month chart costs a few thousand archive reads the first time and none after.
+
+    brownie run tvl main <registry> [days] [points] --network optimism-main
+"""
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from scripts.checkpoints import PoolEvent
+
+SUPPLY_EVENTS = ("Staked", "StakedFor", "Withdrawn", "MigratedIn", "MigratedOut")
+OUTFLOW_EVENTS = ("Withdrawn", "MigratedOut")
+DEFAULT_MAX_GAP = 7_200  # max blocks between two pricePerShare samples
+DEFAULT_CACHE_DIR = "pps_cache"
+
+
+class PriceSeries:
+    """
+    A vault's pricePerShare at sampled blocks. Values are kept as int64 offsets from
+    the first sample, pricePerShare only drifts a little relative to itself.
+    """
+
+    def __init__(self, blocks=(), values=()):
+        values = [int(v) for v in values]
+        self.base = values[0] if values else 0
+        self.blocks = np.zeros(0, dtype=np.int64)
+        self.offsets = np.zeros(0, dtype=np.int64)
+        self.insert(blocks, values)
+
+    def __len__(self):
+        return self.blocks.size
+
+    def insert(self, blocks, values):
+        if not len(self) and len(values):
+            self.base = int(values[0])
+        offsets = np.array([int(v) - self.base for v in values], dtype=np.int64)
+        blocks = np.concatenate([np.asarray(blocks, dtype=np.int64), self.blocks])
+        offsets = np.concatenate([offsets, self.offsets])
+
+        # np.unique keeps the first occurrence, so new samples win
+        self.blocks, first = np.unique(blocks, return_index=True)
+        self.offsets = offsets[first]
+
+    def at(self, blocks):
+        """pricePerShare at each block as a float, held flat past either end."""
+        if not len(self):
+            raise ValueError("No pricePerShare samples")
+        offsets = np.interp(
+            np.asarray(blocks, dtype=np.int64), self.blocks, self.offsets
+        )
+        return float(self.base) + offsets
+
+    def missing(self, blocks, max_gap=DEFAULT_MAX_GAP):
+        """Blocks that aren't sampled or bracketed by samples at most max_gap apart."""
+        blocks = np.unique(np.asarray(blocks, dtype=np.int64))
+        if not len(self):
+            return blocks
+        last = len(self) - 1
+        i = np.searchsorted(self.blocks, blocks, "right")
+        left = self.blocks[np.clip(i - 1, 0, last)]
+        right = self.blocks[np.clip(i, 0, last)]
+        bracketed = (i > 0) & (i <= last) & (right - left <= max_gap)
+        return blocks[~(bracketed | (left == blocks))]
+
+    def save(self, path):
+        np.savez_compressed(
+            path,
+            base=np.array([str(self.base)]),
+            blocks=np.diff(self.blocks, prepend=0),
+            offsets=np.diff(self.offsets, prepend=0),
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            series = cls()
+            series.base = int(data["base"][0])
+            series.blocks = np.cumsum(data["blocks"])
+            series.offsets = np.cumsum(data["offsets"])
+        return series
+
+
+class PriceCache:
+    """PriceSeries per vault, saved under cache_dir, at most max_series kept in memory."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_series=32, fetch=None):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_series = max_series
+        self.fetch = fetch or fetch_price_per_share
+        self.fetched = 0
+        self._series = OrderedDict()
+
+    def _path(self, vault):
+        return self.cache_dir / f"{str(vault).lower()}.npz"
+
+    def get(self, vault):
+        vault = str(vault).lower()
+        if vault in self._series:
+            self._series.move_to_end(vault)
+            return self._series[vault]
+
+        path = self._path(vault)
+        series = PriceSeries.load(path) if path.exists() else PriceSeries()
+        self._series[vault] = series
+        if len(self._series) > self.max_series:
+            self._series.popitem(last=False)
+        return series
+
+    def fill(self, vault, blocks, harvests=(), max_gap=DEFAULT_MAX_GAP):
+        """
+        Fetch whatever is needed to interpolate at every block: harvests we haven't
+        seen, and the max_gap grid points around each block that isn't covered yet.
+        Returns the number of blocks fetched.
+        """
+        series = self.get(vault)
+        missing = series.missing(blocks, max_gap)
+        wanted = [np.asarray(harvests, dtype=np.int64)]
+        if len(missing):
+            cells = np.unique(missing // max_gap)
+            grid = np.concatenate([cells, cells + 1]) * max_gap
+            wanted.append(np.clip(grid, missing[0], missing[-1]))
+
+        wanted = np.unique(np.concatenate(wanted))
+        wanted = wanted[~np.isin(wanted, series.blocks)]
+        if len(wanted):
+            series.insert(wanted, self.fetch(vault, wanted.tolist()))
+            series.save(self._path(vault))
+            self.fetched += len(wanted)
+        return len(wanted)
+
+
+def fetch_price_per_share(vault, blocks):
+    from brownie import interface
+
+    vault = interface.IVaultFactory045(vault)
+    return [vault.pricePerShare(block_identifier=block) for block in blocks]
+
+
+def supply_events(pool, from_block, to_block):
+    """Staking events only, without the per-block timestamp lookups."""
+    events = [
+        PoolEvent(
+            log.blockNumber, log.logIndex, None, name, log.args.user, log.args.amount
+        )
+        for name in SUPPLY_EVENTS
+        for log in getattr(pool.events, name).get_sequence(from_block, to_block)
+    ]
+    return sorted(events, key=lambda e: (e.block, e.log_index))
+
+
+def supply_series(events, initial=0):
+    """totalSupply() as (blocks, supply at the end of that block)."""
+    supply, blocks, values = initial, [], []
+    for event in events:
+        if event.name not in SUPPLY_EVENTS:
+            continue
+        supply += -event.amount if event.name in OUTFLOW_EVENTS else event.amount
+        if blocks and blocks[-1] == event.block:
+            values[-1] = supply
+        else:
+            blocks.append(event.block)
+            values.append(supply)
+    return np.array(blocks, dtype=np.int64), [initial] + values
+
+
+def pool_tvl(supply, prices, blocks, decimals):
+    """TVL in whole underlying tokens at each block."""
+    supply_blocks, values = supply
+    i = np.searchsorted(supply_blocks, np.asarray(blocks, dtype=np.int64), "right")
+    staked = np.array([values[j] for j in i], dtype=float)
+    return staked * prices.at(blocks) / 10 ** (2 * decimals)
+
+
+def block_at(timestamp):
+    """Last block mined at or before timestamp."""
+    from brownie import chain
+
+    low, high = 0, chain.height
+    while low < high:
+        mid = (low + high + 1) // 2
+        if chain[mid].timestamp <= timestamp:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def chart(series, timestamps, out):
+    """Stacked TVL chart, series maps pool label -> TVL per timestamp."""
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from datetime import datetime, timezone
+
+    dates = [datetime.fromtimestamp(int(t), timezone.utc) for t in timestamps]
+    fig, ax = plt.subplots(figsize=(12, 6))
+    ax.stackplot(dates, *series.values(), labels=list(series))
+    ax.set_ylabel("TVL (underlying tokens)")
+    ax.legend(loc="upper left", fontsize="small")
+    fig.autofmt_xdate()
+    fig.savefig(out, dpi=120, bbox_inches="tight")
+    plt.close(fig)
+    return out
+
+
+def deployment_block(address, low=0, high=None):
+    """First block at which `address` has code, low if it already did then."""
+    from brownie import chain, web3
+
+    high = chain.height if high is None else high
+    if web3.eth.get_code(address, block_identifier=low):
+        return low
+    while low < high:
+        mid = (low + high) // 2
+        if web3.eth.get_code(address, block_identifier=mid):
+            high = mid
+        else:
+            low = mid + 1
+    return low
+
+
+def all_pools(registry, to_block):
+    """(vault, pool) for the current pools and every pool the registry replaced."""
+    pools = [
+        (log.args.token, log.args.stakingPool)
+        for log in registry.events.StakingPoolAdded.get_sequence(0, to_block)
+    ]
+    for i in range(registry.numTokens()):
+        token = registry.tokens(i)
+        pools.append((token, registry.stakingPool(token)))
+    return list(dict.fromkeys(pools))
+
+
+def main(registry, days=365, points=720, out="tvl.png"):
+    from brownie import StakingRewards, StakingRewardsRegistry, chain, interface
+
+    start = time.perf_counter()
+    registry = StakingRewardsRegistry.at(registry)
+    to_block = chain.height
+    from_block = block_at(chain[-1].timestamp - int(days) * 86400)
+    blocks = np.linspace(from_block, to_block, int(points)).astype(np.int64)
+
+    # a handful of block timestamps is plenty to place chart points in time
+    anchors = np.unique(np.linspace(from_block, to_block, 32).astype(np.int64))
+    anchor_times = [chain[int(b)].timestamp for b in anchors]
+    timestamps = np.interp(blocks, anchors, anchor_times)
+
+    cache = PriceCache()
+    series = {}
+    pools = all_pools(registry, to_block)
+    for vault_address, pool_address in pools:
+        vault = interface.IVaultFactory045(vault_address)
+        pool = StakingRewards.at(pool_address)
+
+        # nothing was staked before both contracts existed, and reads there fail
+        first = max(
+            deployment_block(vault_address, from_block, to_block),
+            deployment_block(pool_address, from_block, to_block),
+        )
+        live = blocks[blocks >= first]
+        harvests = {
+            log.blockNumber
+            for log in vault.events.StrategyReported.get_sequence(first, to_block)
+        }
+        cache.fill(vault_address, live, sorted(harvests))
+
+        supply = supply_series(
+            supply_events(pool, first + 1, to_block),
+            pool.totalSupply(block_identifier=first),
+        )
+        tvl = np.zeros(len(blocks))
+        tvl[blocks >= first] = pool_tvl(
+            supply, cache.get(vault_address), live, vault.decimals()
+        )
+        if not tvl.any():
+            continue
+        label = vault.symbol()
+        if pool_address != registry.stakingPool(vault_address):
+            label += f" (replaced {pool_address[:8]})"
+        series[label] = tvl
+        print(f"{label:<36}{tvl[-1]:>20,.2f}")
+
+    chart(series, timestamps, out)
+    print(
+        f"\n{len(series)} of {len(pools)} pools had TVL, {len(blocks)} points,"
+        f" {cache.fetched:,} pricePerShare reads, {time.perf_counter() - start:.1f}s."
+        f" Chart written to {out}"
+    )
@@ -1,6 +1,7 @@
 import pytest
 from brownie import config
 from brownie import Contract, interface
+from scripts.local_system import deploy_local_system
 
 
 # Function scoped isolation fixture to enable xdist.
@@ -147,6 +148,12 @@ def zap(StakingRewardsZap, gov, registry):
     yield zap
 
 
+@pytest.fixture
+def lens(StakingRewardsLens, gov, registry):
+    lens = gov.deploy(StakingRewardsLens, registry)
+    yield lens
+
+
 @pytest.fixture
 def new_zap(StakingRewardsZap, gov, live_registry):
     new_zap = gov.deploy(StakingRewardsZap, live_registry)
@@ -204,6 +211,51 @@ def yvusdc_pool(StakingRewards, gov, registry, yvusdc, yvop, zap):
     yield yvusdc_pool
 
 
+# local mocks deployed from a dev account, for tests that don't need forked state
+@pytest.fixture
+def local_system(accounts):
+    local_system = deploy_local_system(accounts[0])
+    yield local_system
+
+
+@pytest.fixture
+def deployer(local_system):
+    yield local_system.gov
+
+
+@pytest.fixture
+def mock_token(local_system):
+    yield local_system.underlying
+
+
+@pytest.fixture
+def mock_reward(local_system):
+    yield local_system.reward
+
+
+@pytest.fixture
+def mock_vault(local_system):
+    yield local_system.vault
+
+
+@pytest.fixture
+def mock_zap(local_system):
+    yield local_system.zap
+
+
+@pytest.fixture
+def mock_pool(local_system):
+    yield local_system.pool
+
+
+# locally generated account, so we have a private key to sign with
+@pytest.fixture
+def signer(accounts, user):
+    signer = accounts.add()
+    user.transfer(signer, 10**18)
+    yield signer
+
+
 @pytest.fixture(scope="session")
 def RELATIVE_APPROX():
     yield 1e-2
@@ -0,0 +1,92 @@
+import asyncio
+import time
+
+import pytest
+from brownie import chain, web3
+from scripts.async_rpc import (
+    EARNED,
+    AsyncRPC,
+    RPCError,
+    StandInNode,
+    TokenBucket,
+    earned_many,
+    fake_accounts,
+    read_uint,
+)
+from scripts.local_system import fund_staker
+
+
+# batched, coalesced and rate-limited reads should give the same answers as serial ones
+def test_stand_in_node():
+    async def run():
+        pool = "0x" + "11" * 20
+        accounts = fake_accounts(500) * 2
+        async with StandInNode(rate=400) as node:
+            async with AsyncRPC(node.url, batch_size=1, batch_delay=0) as rpc:
+                serial = [await read_uint(rpc, pool, EARNED, a) for a in accounts[:50]]
+            async with AsyncRPC(node.url, batch_size=50, rate=300) as rpc:
+                concurrent = await earned_many(rpc, pool, accounts)
+                stats = dict(rpc.stats)
+                try:
+                    await rpc.request("eth_sendTransaction", [{}])
+                    raised = False
+                except RPCError:
+                    raised = True
+        return serial, concurrent, stats, raised
+
+    serial, concurrent, stats, raised = asyncio.run(run())
+    assert concurrent[:50] == serial
+    assert stats["coalesced"] == 500
+    assert stats["http"] - stats["throttled"] <= 10
+    assert raised
+
+
+# batches are charged per request, so batched reads stay under the rate limit
+def test_rate_limit_counts_batched_requests():
+    async def run():
+        pool = "0x" + "11" * 20
+        accounts = fake_accounts(400)
+        async with StandInNode(latency=0) as node:
+            async with AsyncRPC(node.url, batch_size=100, rate=200, burst=20) as rpc:
+                start = time.perf_counter()
+                await earned_many(rpc, pool, accounts)
+                elapsed = time.perf_counter() - start
+                batch_size = rpc.batch_size
+        return node.calls, elapsed, batch_size
+
+    calls, elapsed, batch_size = asyncio.run(run())
+    assert calls == 400 and batch_size == 20
+    # the first burst is free, everything after it is paced at `rate`
+    assert (calls - 20) / elapsed <= 200
+
+
+# under one request per second the burst still fits a request
+def test_rate_limit_below_one_per_second():
+    async def run():
+        async with StandInNode(latency=0) as node:
+            async with AsyncRPC(node.url, rate=0.5) as rpc:
+                value = await read_uint(rpc, "0x" + "11" * 20, EARNED, "0x" + "22" * 20)
+                return rpc.batch_size, value
+
+    batch_size, value = asyncio.run(run())
+    assert batch_size == 1 and value >= 0
+    with pytest.raises(ValueError):
+        TokenBucket(10, burst=0.5)
+
+
+def test_earned_matches_pool(accounts, local_system, deployer, mock_pool, mock_reward):
+    user = accounts[1]
+    fund_staker(local_system, user, 100e18, [mock_pool])
+    mock_pool.stake(100e18, {"from": user})
+    mock_reward.mint(mock_pool, 10e18, {"from": deployer})
+    mock_pool.notifyRewardAmount(10e18, {"from": deployer})
+    chain.sleep(3600)
+    chain.mine(1)
+
+    async def run():
+        async with AsyncRPC(web3.provider.endpoint_uri) as rpc:
+            return await earned_many(
+                rpc, mock_pool.address, [user.address, deployer.address]
+            )
+
+    assert asyncio.run(run()) == [mock_pool.earned(user), 0]
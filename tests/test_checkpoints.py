@@ -0,0 +1,109 @@
+from brownie import chain
+from scripts.checkpoints import (
+    CheckpointIndex,
+    PoolEvent,
+    events_from_chain,
+    synthetic_events,
+)
+from scripts.local_system import deploy_local_system, fund_rewards, fund_staker
+from scripts.reward_math import StakingRewardsModel
+
+
+# rebuilding from on-chain events should match earned() now and in the past
+def test_checkpoints_match_pool(accounts, gov):
+    s = deploy_local_system(gov)
+    start = chain.height
+    users = accounts[:3]
+    for user in users:
+        fund_staker(s, user, 500e18, [s.pool], zap_amount=500e18)
+
+    history = []
+    s.pool.stake(100e18, {"from": users[0]})
+    fund_rewards(s, s.pool, 100e18)
+    for i in range(6):
+        chain.sleep(20_000)
+        user = users[i % 3]
+        if i % 3 == 0:
+            s.zap.zapIn(s.vault, 50e18, {"from": user})
+        elif i % 3 == 1:
+            s.pool.stake(30e18, {"from": user})
+        else:
+            s.pool.withdraw(10e18, {"from": users[0]})
+            s.pool.getReward({"from": users[1]})
+        chain.mine(1)
+        history.append((chain[-1].timestamp, [s.pool.earned(u) for u in users]))
+
+    # rewards roll over mid-period
+    fund_rewards(s, s.pool, 50e18)
+    chain.sleep(86400 * 8)
+    chain.mine(1)
+
+    index = CheckpointIndex(rewards_token=s.reward.address)
+    index.extend(events_from_chain(s.pool, start))
+    assert index.size > 0
+
+    now = chain[-1].timestamp
+    for user in users:
+        assert index.earned(user.address, now) == s.pool.earned(user)
+    assert index.reward_per_token(now) == s.pool.rewardPerToken()
+
+    # timestamps we looked at earlier, each one between two checkpoints
+    for timestamp, earned in history:
+        assert [index.earned(u.address, timestamp) for u in users] == earned
+
+
+def test_checkpoints_match_model():
+    # 1 wei staked alone for days pushes rewardPerTokenStored well past 128 bits
+    dust = [
+        PoolEvent(0, 0, 1_000, "Staked", "user0", 1),
+        PoolEvent(1, 0, 1_000, "RewardAdded", None, 1_000 * 10**18),
+        PoolEvent(2, 0, 1_000 + 86400 * 5, "RewardPaid", "user0", 0),
+        PoolEvent(3, 0, 1_000 + 86400 * 6, "Staked", "user5", 10**21),
+        PoolEvent(4, 0, 1_000 + 86400 * 8, "Withdrawn", "user0", 1),
+        PoolEvent(5, 0, 1_000 + 86400 * 9, "RewardAdded", None, 10**21),
+        PoolEvent(6, 0, 1_000 + 86400 * 10, "RewardPaid", "user5", 0),
+    ]
+    for events in (list(synthetic_events(5_000, users=20, seed=11)), dust):
+        index = CheckpointIndex(capacity=1).extend(events)
+        model = StakingRewardsModel()
+        for event, following in zip(events, events[1:]):
+            index_at = following.timestamp - 1
+            if event.name in ("Staked", "StakedFor"):
+                model.stake(event.account, event.amount, event.timestamp)
+            elif event.name == "Withdrawn":
+                model.withdraw(event.account, event.amount, event.timestamp)
+            elif event.name == "RewardPaid":
+                model.get_reward(event.account, event.timestamp)
+            else:
+                model.notify_reward_amount(event.amount, event.timestamp, False)
+            if index_at <= event.timestamp:
+                continue
+            assert index.reward_per_token(index_at) == model.reward_per_token(index_at)
+            for account in ("user0", "user5", event.account):
+                if account:
+                    assert index.earned(account, index_at) == model.earned(
+                        account, index_at
+                    )
+    assert index._value("stored", index.size - 1) >> 128
+
+
+# a retired pool reports rewardPerTokenStored while empty and zero otherwise
+def test_checkpoints_retired_pool():
+    for remaining in (0, 10**17):
+        events = [
+            PoolEvent(1, 0, 1_000, "Staked", "user0", 10**18),
+            PoolEvent(2, 0, 1_000, "RewardAdded", None, 604_800 * 10**18),
+            PoolEvent(3, 0, 2_000, "Withdrawn", "user0", 10**18 - remaining),
+            PoolEvent(4, 0, 10_000_000, "Recovered", "reward", 0),
+        ]
+        index = CheckpointIndex(rewards_token="reward").extend(events)
+        model = StakingRewardsModel()
+        model.stake("user0", 10**18, 1_000)
+        model.notify_reward_amount(604_800 * 10**18, 1_000, False)
+        model.withdraw("user0", 10**18 - remaining, 2_000)
+        model.recover_rewards(10_000_000)
+
+        expected = model.reward_per_token(10_000_050)
+        assert expected == (0 if remaining else 1_000 * 10**18)
+        assert index.reward_per_token(10_000_050) == expected
+        assert index.earned("user0", 10_000_050) == model.earned("user0", 10_000_050)
@@ -0,0 +1,53 @@
+import pytest
+from scripts.checkpoints import CheckpointIndex, synthetic_events
+from scripts.event_archive import (
+    ZLIB,
+    ArchiveReader,
+    benchmark_events,
+    decode_varints,
+    encode_varints,
+    write_archive,
+)
+
+
+def test_varints():
+    values = [0, 1, 127, 128, 300, 16_384, 2**63, 2**64 - 1]
+    data = encode_varints(values)
+    decoded, end = decode_varints(data, len(values))
+    assert decoded.tolist() == values and end == len(data)
+
+
+# round trip with addresses, large amounts and empty accounts, read back by range
+@pytest.mark.parametrize("codec", [None, ZLIB])
+def test_archive_round_trip(tmp_path, codec):
+    events = list(benchmark_events(5_000, users=200, seed=4))
+    last = events[-1]
+    events.append(last._replace(block=last.block + 1, amount=2**256 - 1))
+    events.append(last._replace(block=last.block + 2, name="RewardAdded", account=None))
+
+    path = tmp_path / "events.spev"
+    assert write_archive(path, events, chunk_size=700, codec=codec) == len(events)
+    with ArchiveReader(path) as reader:
+        assert reader.count == len(events)
+        assert list(reader) == events
+        middle = events[2_500].block
+        expected = [e for e in events if middle <= e.block <= middle + 40]
+        assert list(reader.events(middle, middle + 40)) == expected
+
+    with pytest.raises(ValueError):
+        write_archive(tmp_path / "unordered.spev", events[::-1])
+
+
+# checkpoints rebuilt straight from an archive match the in-memory events
+def test_archive_feeds_checkpoints(tmp_path):
+    events = list(synthetic_events(3_000, users=15, seed=5))
+    path = tmp_path / "events.spev"
+    write_archive(path, events, chunk_size=256)
+
+    expected = CheckpointIndex().extend(events)
+    with ArchiveReader(path) as reader:
+        index = CheckpointIndex().extend(reader)
+    timestamp = events[-1].timestamp + 3600
+    for user in range(15):
+        account = f"user{user}"
+        assert index.earned(account, timestamp) == expected.earned(account, timestamp)
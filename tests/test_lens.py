@@ -0,0 +1,54 @@
+import brownie
+from brownie import ZERO_ADDRESS, chain
+from scripts.lens import benchmark, read_pools, read_pools_direct
+
+
+# the lens should return exactly what per-call reads return, in one call
+def test_lens(
+    gov,
+    yvdai,
+    yvdai_amount,
+    yvdai_whale,
+    yvusdc,
+    yvop,
+    yvop_whale,
+    registry,
+    lens,
+    yvdai_pool,
+    yvusdc_pool,
+):
+    # nothing registered yet
+    assert lens.registeredPools() == []
+    assert lens.getAllPools(yvdai_whale) == []
+
+    registry.addStakingPool(yvdai_pool, yvdai, False, {"from": gov})
+    registry.addStakingPool(yvusdc_pool, yvusdc, False, {"from": gov})
+    assert lens.registeredPools() == [yvdai_pool.address, yvusdc_pool.address]
+
+    # stake and start rewards so every field has something in it
+    yvdai.approve(yvdai_pool, 2**256 - 1, {"from": yvdai_whale})
+    yvdai_pool.stake(yvdai_amount, {"from": yvdai_whale})
+    yvop.transfer(yvdai_pool, 100e18, {"from": yvop_whale})
+    yvdai_pool.notifyRewardAmount(100e18, {"from": gov})
+    chain.sleep(86400)
+    chain.mine(1)
+
+    info = read_pools(lens, yvdai_whale)
+    assert info == read_pools_direct([yvdai_pool, yvusdc_pool], yvdai_whale)
+    assert info[0]["balance"] == yvdai_amount
+    assert info[0]["earned"] == yvdai_pool.earned(yvdai_whale) > 0
+    assert info[0]["pricePerShare"] == yvdai.pricePerShare()
+    assert info[1]["totalSupply"] == 0
+
+    # explicit pool lists work too, and a zero account is fine
+    info = read_pools(lens, ZERO_ADDRESS, [yvusdc_pool])
+    assert info[0]["pool"] == yvusdc_pool.address
+    assert info[0]["balance"] == 0
+
+    # not a staking pool
+    with brownie.reverts():
+        lens.getPool(yvdai, yvdai_whale)
+
+    result = benchmark(lens, yvdai_whale, rounds=2)
+    assert result["pools"] == 2
+    assert result["direct_calls"] > result["lens_calls"]
@@ -0,0 +1,34 @@
+from scripts.load_test import GAS_LIMIT, build_schedule, eth_funding, run_load_test
+
+
+def test_schedule_is_reproducible():
+    schedule = build_schedule(2_000, 50, 100, seed=7)
+    assert schedule == build_schedule(2_000, 50, 100, seed=7)
+    assert schedule != build_schedule(2_000, 50, 100, seed=8)
+
+    # nobody withdraws more than they staked
+    staked = [0] * 50
+    for _, user, action, amount in schedule:
+        if action in ("zapIn", "stake"):
+            staked[user] += amount
+        elif action == "withdraw":
+            staked[user] -= amount
+            assert staked[user] >= 0
+
+    # each account gets gas for its own transactions plus two approvals, no more
+    eth = eth_funding(schedule, 50, 10**9)
+    assert len(eth) == 50
+    assert sum(eth) == (2_000 + 2 * 50) * GAS_LIMIT * 10**9
+    assert eth_funding(schedule, 50, 0) == [0] * 50
+
+
+# a short burst against the local chain should go through cleanly
+def test_load_test(gov):
+    report = run_load_test(gov, users=8, rate=100, transactions=60, seed=1)
+    summary = report["summary"]
+    assert summary["transactions"] == 60
+    assert summary["failed"] == 0
+    assert sum(row["ok"] for row in summary["actions"].values()) == 60
+
+    stored = [block["reward_per_token_stored"] for block in report["blocks"]]
+    assert stored and stored == sorted(stored)
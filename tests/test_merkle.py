@@ -0,0 +1,137 @@
+import brownie
+import pytest
+from brownie import chain
+from scripts.checkpoints import PoolEvent, events_from_chain
+from scripts.local_system import deploy_local_system, fund_rewards, fund_staker
+from scripts.merkle import (
+    MerkleTree,
+    _fake_claims,
+    deploy_distributor,
+    leaf_hash,
+    snapshot,
+    verify,
+)
+
+
+# odd sizes leave unpaired nodes at several levels, bulk proofs must still match
+def test_tree_proofs(tmp_path):
+    for count in (1, 2, 3, 13, 257):
+        claims = list(_fake_claims(count))
+        tree = MerkleTree.build(claims, tmp_path / str(count))
+        for block in (1, 4, 64):
+            proofs = list(tree.proofs(block))
+            assert proofs == [tree.proof(i) for i in range(count)]
+        for index, (account, amount) in enumerate(claims):
+            assert verify(proofs[index], tree.root, leaf_hash(index, account, amount))
+        assert not verify(proofs[0], tree.root, leaf_hash(0, claims[0][0], 1))
+        assert tree.total == sum(amount for _, amount in claims)
+        tree.close()
+
+
+# a getReward at the sweep's timestamp is already paid, the snapshot mustn't owe it
+def test_snapshot_in_event_order():
+    sweep_at = 1_000 + 86400 * 10
+    events = [
+        PoolEvent(1, 0, 1_000, "Staked", "alice", 10**18),
+        PoolEvent(1, 1, 1_000, "Staked", "bob", 10**18),
+        PoolEvent(2, 0, 1_000, "RewardAdded", None, 604_800 * 10**18),
+        # alice front-runs the sweep in an earlier block with the same timestamp
+        PoolEvent(3, 0, sweep_at, "RewardPaid", "alice", 302_400 * 10**18),
+        PoolEvent(4, 0, sweep_at, "RewardPaid", "bob", 0),
+        PoolEvent(4, 1, sweep_at, "Recovered", "reward", 0),
+    ]
+    assert snapshot(events[:4] + events[5:], "reward") == [("bob", 302_400 * 10**18)]
+    assert snapshot(events, "reward") == []
+    with pytest.raises(ValueError):
+        snapshot(events[:-1], "reward")
+
+
+# snapshot a retired pool, pay it out through the distributor, totals reconcile
+def test_distributor_pays_out_pool(accounts, gov, tmp_path):
+    s = deploy_local_system(gov)
+    pool, users = s.pool, accounts[1:6]
+    for i, user in enumerate(users):
+        amount = (i + 1) * 100e18
+        fund_staker(s, user, amount, [pool])
+        pool.stake(amount, {"from": user})
+    fund_rewards(s, pool, 1_000e18)
+
+    # one user leaves early, another claims halfway and stays
+    chain.sleep(86400 * 3)
+    pool.exit({"from": users[0]})
+    chain.sleep(86400 * 2)
+    pool.getReward({"from": users[1]})
+    chain.sleep(86400 * 91)
+    chain.mine(1)
+
+    owed = {user.address: pool.earned(user) for user in users}
+    assert owed[users[0].address] == 0
+
+    # a live pool still pays out itself, a distributor would pay stakers twice
+    with pytest.raises(ValueError):
+        snapshot(events_from_chain(pool, 0), s.reward.address)
+    with pytest.raises(ValueError):
+        deploy_distributor(gov, pool, None, chain[-1].timestamp + 86400 * 30)
+
+    # sweeping retires the pool, the snapshot still sees balances from before
+    pool.recoverERC20(s.reward, s.reward.balanceOf(pool), {"from": gov})
+    assert pool.isRetired()
+    events = events_from_chain(pool, 0)
+    claims = list(snapshot(events, s.reward.address))
+    assert dict(claims) == {a: owed[a] for a in sorted(owed) if owed[a]}
+
+    tree = MerkleTree.build(claims, tmp_path / "tree")
+    distributor = deploy_distributor(gov, pool, tree, chain[-1].timestamp + 86400 * 30)
+    s.reward.transfer(distributor, tree.total, {"from": gov})
+
+    claims = list(tree.claims())
+    for claim in claims[1:]:
+        distributor.claim(
+            claim["index"],
+            claim["account"],
+            claim["amount"],
+            claim["proof"],
+            {"from": gov},
+        )
+        assert s.reward.balanceOf(claim["account"]) >= claim["amount"]
+        assert distributor.isClaimed(claim["index"])
+
+    first = claims[0]
+    with brownie.reverts("invalid proof"):
+        distributor.claim(
+            first["index"],
+            first["account"],
+            first["amount"] + 1,
+            first["proof"],
+            {"from": gov},
+        )
+    with brownie.reverts("already claimed"):
+        last = claims[-1]
+        distributor.claim(
+            last["index"], last["account"], last["amount"], last["proof"], {"from": gov}
+        )
+    with brownie.reverts("claim period not over"):
+        distributor.recoverERC20(s.reward, 1, {"from": gov})
+
+    distributor.claim(
+        first["index"],
+        first["account"],
+        first["amount"],
+        first["proof"],
+        {"from": gov},
+    )
+    assert distributor.totalClaimed() == tree.total == sum(owed.values())
+    assert s.reward.balanceOf(distributor) == 0
+
+    # past the deadline nothing more can be claimed
+    chain.sleep(86400 * 31)
+    chain.mine(1)
+    with brownie.reverts("claim period over"):
+        distributor.claim(
+            first["index"],
+            first["account"],
+            first["amount"],
+            first["proof"],
+            {"from": gov},
+        )
+    tree.close()
@@ -0,0 +1,140 @@
+import brownie
+import pytest
+from brownie import chain
+from scripts.checkpoints import CheckpointIndex, events_from_chain
+from scripts.local_system import (
+    deploy_local_system,
+    deploy_pool,
+    fund_rewards,
+    fund_staker,
+)
+from scripts.migrate import (
+    benchmark,
+    plan_migration,
+    reconcile,
+    size_batches,
+    submit_batches,
+)
+
+
+def test_size_batches():
+    # accounts new to the target pool cost more, batches must still fit
+    costs = {f"user{i}": 40_000 + 20_000 * (i % 3 == 0) for i in range(500)}
+    estimate = lambda batch: 60_000 + sum(costs[a] for a in batch)
+    accounts = list(costs)
+    batches, gas = size_batches(accounts, estimate, 2_000_000)
+    assert [a for b in batches for a in b] == accounts
+    assert gas == [estimate(b) for b in batches]
+    assert max(gas) <= 2_000_000
+    assert len(batches) == 13
+
+    assert size_batches([], estimate, 2_000_000) == ([], [])
+    with pytest.raises(ValueError):
+        size_batches(accounts, estimate, 50_000)
+
+
+# move everyone from a replaced pool in several batches, both pools reconcile
+def test_migrate_replaced_pool(accounts, gov):
+    s = deploy_local_system(gov)
+    start = chain.height
+    old, users = s.pool, accounts[:8]
+    for i, user in enumerate(users):
+        amount = (i + 1) * 10 * 10**18
+        fund_staker(s, user, amount, [old])
+        old.stake(amount, {"from": user})
+    fund_rewards(s, old, 100e18)
+    chain.sleep(86400 * 2)
+
+    # one user leaves early with rewards left unclaimed, one is in both pools
+    old.withdraw(old.balanceOf(users[0]), {"from": users[0]})
+    new = deploy_pool(s, s.vault, True)
+    fund_rewards(s, new, 50e18)
+    s.vault.approve(new, 2**256 - 1, {"from": users[1]})
+    new.stake(1e18, {"from": users[1]})
+
+    with brownie.reverts("Only migrator"):
+        old.migrate([users[2]], {"from": gov})
+    old.setMigration(new, gov, {"from": gov})
+    with brownie.reverts("Staking pool is migrating"):
+        old.stake(1, {"from": users[2]})
+    with brownie.reverts("Migration delay not over"):
+        old.migrate([users[2]], {"from": gov})
+
+    chain.sleep(old.MIGRATION_DELAY())
+    chain.mine(1)
+    with brownie.reverts("Only migration source"):
+        old.migrate([users[2]], {"from": gov})
+    with brownie.reverts("Only migration source"):
+        new.acceptMigration([users[2]], [1], [0], {"from": gov})
+    new.setMigrationSource(old, {"from": gov})
+
+    plan = plan_migration(old, new, gov, start, gas_limit=1_000_000)
+    assert set(plan["accounts"]) == {u.address for u in users}
+    assert len(plan["batches"]) > 1
+    assert max(plan["gas"]) <= plan["budget"]
+
+    result = reconcile(plan, submit_batches(plan))
+    assert result["ok"], result
+    assert result["staked"] == result["planned_staked"] == 350 * 10**18
+    assert result["rewards"] >= result["planned_rewards"]
+    assert old.totalSupply() == 0
+    assert s.vault.balanceOf(new) == new.totalSupply()
+
+    # rewards carried over are paid by the new pool
+    before = s.reward.balanceOf(users[0])
+    new.getReward({"from": users[0]})
+    assert s.reward.balanceOf(users[0]) - before >= plan["earned"][users[0].address]
+
+    # replaying both pools' events gives what the contracts report
+    now = chain[-1].timestamp
+    for pool in (old, new):
+        index = CheckpointIndex(rewards_token=s.reward.address)
+        index.extend(events_from_chain(pool, start))
+        for user in users:
+            assert index.earned(user.address, now) == pool.earned(user)
+
+
+# a fake pool can pass the getter checks, stakers get the delay to leave first
+def test_migration_to_malicious_target(accounts, gov, MockMigrationThief):
+    s = deploy_local_system(gov)
+    old, user, stayer = s.pool, accounts[1], accounts[2]
+    for staker in (user, stayer):
+        fund_staker(s, staker, 100e18, [old])
+        old.stake(100e18, {"from": staker})
+    fund_rewards(s, old, 100e18)
+    chain.sleep(86400)
+
+    other = gov.deploy(MockMigrationThief, accounts[3], s.vault, s.reward)
+    with brownie.reverts("owner mismatch"):
+        old.setMigration(other, gov, {"from": gov})
+    wrong_token = gov.deploy(MockMigrationThief, gov, s.underlying, s.reward)
+    with brownie.reverts("token mismatch"):
+        old.setMigration(wrong_token, gov, {"from": gov})
+
+    thief = gov.deploy(MockMigrationThief, gov, s.vault, s.reward)
+    tx = old.setMigration(thief, gov, {"from": gov})
+    assert old.migrationStart() == tx.timestamp + old.MIGRATION_DELAY()
+    with brownie.reverts("Migration delay not over"):
+        old.migrate([user, stayer], {"from": gov})
+
+    # during the delay a staker who doesn't trust the target leaves with everything
+    chain.sleep(old.MIGRATION_DELAY() - 3600)
+    earned = old.earned(user)
+    old.exit({"from": user})
+    assert s.vault.balanceOf(user) == 100e18
+    assert s.reward.balanceOf(user) >= earned > 0
+
+    # only what stayed can be taken once the delay is over
+    chain.sleep(3600)
+    chain.mine(1)
+    old.migrate([user, stayer], {"from": gov})
+    assert s.vault.balanceOf(thief) == 100e18
+    assert s.vault.balanceOf(user) == 100e18
+
+
+def test_migration_benchmark(gov):
+    results = benchmark(gov, users=12)
+    manual, batched = results["exit_and_restake"], results["migration"]
+    assert manual["transactions"] == 36
+    assert batched["accounts_per_batch"] == 12
+    assert batched["gas"] < manual["gas"]
@@ -0,0 +1,75 @@
+import brownie
+from scripts.local_system import fund_staker
+from scripts.permit import compare_stake, compare_zap, pack_signature, sign_permit
+
+DEADLINE = 2**256 - 1
+
+
+def test_stake_with_permit(local_system, deployer, signer, mock_vault, mock_pool):
+    amount = 100e18
+    fund_staker(local_system, signer, 2 * amount)
+
+    # signature for the wrong amount shouldn't work
+    bad = pack_signature(
+        *sign_permit(mock_vault, signer, mock_pool, amount - 1, DEADLINE)
+    )
+    with brownie.reverts():
+        mock_pool.stakeWithPermit(amount, DEADLINE, bad, {"from": signer})
+
+    # no approve needed
+    assert mock_vault.allowance(signer, mock_pool) == 0
+    signature = pack_signature(
+        *sign_permit(mock_vault, signer, mock_pool, amount, DEADLINE)
+    )
+    mock_pool.stakeWithPermit(amount, DEADLINE, signature, {"from": signer})
+    assert mock_pool.balanceOf(signer) == amount
+    assert mock_vault.allowance(signer, mock_pool) == 0
+
+    # someone front-runs our permit, we should still be able to stake
+    signature = pack_signature(
+        *sign_permit(mock_vault, signer, mock_pool, amount, DEADLINE)
+    )
+    mock_vault.permit["address,address,uint256,uint256,bytes"](
+        signer, mock_pool, amount, DEADLINE, signature, {"from": deployer}
+    )
+    mock_pool.stakeWithPermit(amount, DEADLINE, signature, {"from": signer})
+    assert mock_pool.balanceOf(signer) == 2 * amount
+
+    with brownie.reverts("Cannot stake 0"):
+        mock_pool.stakeWithPermit(0, DEADLINE, signature, {"from": signer})
+
+
+def test_zap_in_with_permit(
+    deployer, signer, mock_zap, mock_token, mock_vault, mock_pool
+):
+    amount = 100e18
+    mock_token.mint(signer, 2 * amount, {"from": deployer})
+
+    v, r, s = sign_permit(mock_token, signer, mock_zap, amount, DEADLINE)
+    mock_zap.zapInWithPermit(mock_vault, amount, DEADLINE, v, r, s, {"from": signer})
+    assert mock_pool.balanceOf(signer) == amount
+    assert mock_token.balanceOf(mock_zap) == 0
+    assert mock_vault.balanceOf(mock_zap) == 0
+
+    # a used (or front-run) permit is ignored, without allowance the zap still fails
+    with brownie.reverts():
+        mock_zap.zapInWithPermit(
+            mock_vault, amount, DEADLINE, v, r, s, {"from": signer}
+        )
+    assert mock_token.balanceOf(signer) == amount
+
+
+# the permit flow should save at least the approve transaction's base cost
+def test_permit_gas(
+    local_system, deployer, signer, mock_zap, mock_token, mock_vault, mock_pool
+):
+    amount = 100e18
+    mock_token.mint(signer, 2 * amount, {"from": deployer})
+    two_tx, one_tx = compare_zap(mock_zap, mock_vault, mock_token, signer, amount)
+    assert one_tx["transactions"] == 1
+    assert one_tx["gas"] < two_tx["gas"]
+
+    fund_staker(local_system, signer, 2 * amount)
+    two_tx, one_tx = compare_stake(mock_pool, mock_vault, signer, amount)
+    assert one_tx["gas"] < two_tx["gas"]
+    print("\nApprove + stake:", two_tx["gas"], "stakeWithPermit:", one_tx["gas"])
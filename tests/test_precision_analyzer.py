@@ -0,0 +1,59 @@
+from scripts.precision_analyzer import analyze, build_grid, pivot
+from scripts.reward_math import PRECISION, StakingRewardsModel
+
+DURATION = 86400
+
+
+# the vectorized analyzer should agree exactly with stepping the contract math
+def test_analyzer_matches_model():
+    grid = build_grid(
+        staking_decimals=(6, 18),
+        reward_decimals=(6, 18),
+        supply_tokens=(3, 7_777),
+        reward_tokens=(1, 1_234),
+        update_intervals=(7, 3_600),
+        user_shares_ppm=(333_333,),
+    )
+    table = analyze(grid, duration=DURATION)
+
+    for i in range(table["supply"].size):
+        supply = table["supply"][i]
+        reward = table["reward"][i]
+        dt = table["update_interval"][i]
+        balance = supply * table["user_share_ppm"][i] // 1_000_000
+
+        pool = StakingRewardsModel(rewards_duration=DURATION)
+        pool.stake("user", balance, 0)
+        pool.stake("other", supply - balance, 0)
+        pool.reward_balance = reward
+        pool.notify_reward_amount(reward, 0)
+        assert reward - pool.get_reward_for_duration() == table["notify_dust"][i]
+
+        # our user pokes updateReward() every interval until the period ends
+        claimed = 0
+        for t in range(dt, DURATION + dt, dt):
+            claimed += pool.get_reward("user", min(t, DURATION))
+
+        ideal = pool.reward_rate * DURATION * balance / supply
+        assert abs((ideal - claimed) - table["user_loss"][i]) < 1e-6 * max(1, ideal)
+
+        distributed = pool.reward_per_token_stored * supply / PRECISION
+        rpt_dust = pool.get_reward_for_duration() - distributed
+        assert abs(rpt_dust - table["reward_per_token_dust"][i]) < 1e-6 * reward
+
+
+def test_analyzer_pivot():
+    table = analyze(build_grid(supply_tokens=(1, 1e9), user_shares_ppm=(1_000,)))
+    rows, columns, grid = pivot(
+        table,
+        "supply",
+        "update_interval",
+        "undistributed_share",
+        staking_decimals=18,
+        reward_decimals=6,
+    )
+    assert len(rows) == 2 and len(columns) == grid.shape[1]
+
+    # a billion 18-decimal tokens can't see a 6-decimal reward stream per second
+    assert grid[1, 0] == 1.0
+    assert grid[0, 0] < grid[1, 0]
@@ -0,0 +1,162 @@
+import brownie
+from brownie import StakingRewards, StakingRewardsRegistry, chain
+from brownie.test import strategy
+from scripts.local_system import deploy_local_system, fund_rewards, fund_staker
+
+USERS = 4
+START_UNDERLYING = 10_000 * 10**18
+
+
+class StateMachine:
+    """
+    Drives registry, zap, pool and vault changes in random order. Deployment happens
+    once in __init__, brownie reverts to that snapshot before every example.
+    """
+
+    st_user = strategy("uint8", max_value=USERS - 1)
+    st_amount = strategy("uint256", min_value=1, max_value=2_000 * 10**18)
+    st_headroom = strategy("uint256", max_value=2_000 * 10**18)
+    st_sleep = strategy("uint32", max_value=86400 * 3)
+    st_bool = strategy("bool")
+
+    def __init__(cls, accounts, gov):
+        cls.gov = gov
+        cls.users = accounts[:USERS]
+        cls.system = deploy_local_system(gov)
+        s = cls.system
+
+        # spare pool for replacement, and an empty registry to point the zap at
+        cls.spare_pool = gov.deploy(StakingRewards, gov, gov, s.reward, s.vault, s.zap)
+        cls.empty_registry = gov.deploy(StakingRewardsRegistry)
+        fund_rewards(s, s.pool, 1_000 * 10**18)
+
+        for user in cls.users:
+            half = START_UNDERLYING // 2
+            fund_staker(s, user, half, [s.pool, cls.spare_pool], zap_amount=half)
+
+    def setup(self):
+        s = self.system
+        self.pools = [s.pool, self.spare_pool]
+        self.active = 0
+        self.registry = s.registry
+        self.staked = {(p, u): 0 for p in range(2) for u in range(USERS)}
+
+    # helpers
+
+    def _pool(self):
+        return self.pools[self.active]
+
+    def _deposit_ok(self, amount):
+        s = self.system
+        return s.vault.totalAssets() + amount <= s.vault.depositLimit()
+
+    # rules
+
+    def rule_stake(self, st_user, st_amount):
+        user, pool = self.users[st_user], self._pool()
+        if st_amount > self.system.vault.balanceOf(user):
+            with brownie.reverts():
+                pool.stake(st_amount, {"from": user})
+        else:
+            pool.stake(st_amount, {"from": user})
+            self.staked[(self.active, st_user)] += st_amount
+
+    def rule_zap_in(self, st_user, st_amount):
+        s = self.system
+        user = self.users[st_user]
+        routed = self.registry == s.registry
+        ok = (
+            routed
+            and st_amount <= s.underlying.balanceOf(user)
+            and self._deposit_ok(st_amount)
+            and st_amount * 10**18 // s.vault.pricePerShare() > 0
+        )
+        if not ok:
+            with brownie.reverts():
+                s.zap.zapIn(s.vault, st_amount, {"from": user})
+            return
+        tx = s.zap.zapIn(s.vault, st_amount, {"from": user})
+        self.staked[(self.active, st_user)] += tx.return_value
+
+    def rule_withdraw(self, st_user, st_amount, st_bool):
+        # withdraw from either pool, stakers in a replaced pool can always leave
+        index = int(st_bool)
+        user, pool = self.users[st_user], self.pools[index]
+        if st_amount > self.staked[(index, st_user)]:
+            with brownie.reverts():
+                pool.withdraw(st_amount, {"from": user})
+        else:
+            pool.withdraw(st_amount, {"from": user})
+            self.staked[(index, st_user)] -= st_amount
+
+    def rule_get_reward(self, st_user, st_bool):
+        self.pools[int(st_bool)].getReward({"from": self.users[st_user]})
+
+    def rule_replace_pool(self):
+        s = self.system
+        self.active = 1 - self.active
+        s.registry.addStakingPool(self._pool(), s.vault, True, {"from": self.gov})
+
+    def rule_set_pool_registry(self, st_bool):
+        s = self.system
+        self.registry = s.registry if st_bool else self.empty_registry
+        s.zap.setPoolRegistry(self.registry, {"from": self.gov})
+
+    def rule_deposit_limit(self, st_headroom):
+        vault = self.system.vault
+        vault.setDepositLimit(vault.totalAssets() + st_headroom, {"from": self.gov})
+
+    def rule_harvest(self, st_bool):
+        vault = self.system.vault
+        step = 10**16 if st_bool else 10**15
+        vault.setPricePerShare(vault.pricePerShare() + step, {"from": self.gov})
+
+    def rule_recover_erc20(self, st_amount):
+        # stray underlying sent to the zap or a pool can be swept by owners
+        s = self.system
+        pool = self._pool()
+        s.underlying.mint(s.zap, st_amount, {"from": self.gov})
+        s.zap.recoverERC20(s.underlying, st_amount, {"from": self.gov})
+        s.underlying.mint(pool, st_amount, {"from": self.gov})
+        pool.recoverERC20(s.underlying, st_amount, {"from": self.gov})
+        with brownie.reverts("Cannot withdraw the staking token"):
+            pool.recoverERC20(s.vault, 1, {"from": self.gov})
+
+    def rule_sleep(self, st_sleep):
+        chain.sleep(st_sleep)
+        chain.mine(1)
+
+    # invariants
+
+    def invariant_zap_never_retains_tokens(self):
+        s = self.system
+        assert s.underlying.balanceOf(s.zap) == 0
+        assert s.vault.balanceOf(s.zap) == 0
+
+    def invariant_balances_sum_to_total_supply(self):
+        vault = self.system.vault
+        for index, pool in enumerate(self.pools):
+            balances = [pool.balanceOf(u) for u in self.users]
+            assert balances == [self.staked[(index, u)] for u in range(USERS)]
+            assert sum(balances) == pool.totalSupply() == vault.balanceOf(pool)
+
+    def invariant_registry_endorses_active_pool(self):
+        s = self.system
+        assert s.registry.stakingPool(s.vault) == self._pool()
+        assert s.registry.isStakingPoolEndorsed(self._pool())
+        assert s.registry.numTokens() == 1
+
+    def invariant_rewards_solvent(self):
+        s = self.system
+        pool = s.pool
+        owed = sum(pool.earned(u) for u in self.users)
+        assert owed <= s.reward.balanceOf(pool)
+
+
+def test_stateful(state_machine, accounts, gov):
+    state_machine(
+        StateMachine,
+        accounts,
+        gov,
+        settings={"max_examples": 50, "stateful_step_count": 50},
+    )
@@ -0,0 +1,71 @@
+from brownie import chain
+from scripts.lens import deploy_lens
+from scripts.local_system import (
+    deploy_local_system,
+    deploy_pool,
+    fund_rewards,
+    fund_staker,
+)
+from scripts.sweep import (
+    plan_sweeps,
+    read_pool_states,
+    reconcile,
+    registry_pools,
+    submit_sweeps,
+)
+
+
+# only finished pools past the 90 day window get swept, totals should reconcile
+def test_sweep_retired_pools(accounts, gov):
+    s = deploy_local_system(gov)
+    user = accounts[1]
+
+    # replaced pool, funded pool, never funded pool and one on its second period
+    replaced = s.pool
+    pools = [replaced] + [deploy_pool(s, s.vault, True) for _ in range(3)]
+    funded = pools[:3]
+    fund_staker(s, user, 1_000e18, funded)
+    for pool in funded:
+        pool.stake(100e18, {"from": user})
+        fund_rewards(s, pool, 100e18)
+
+    # leave something unclaimed in one pool, claim everything in another
+    chain.sleep(86400 * 8)
+    chain.mine(1)
+    funded[1].exit({"from": user})
+    chain.sleep(86400 * 60)
+    fund_rewards(s, funded[2], 100e18)
+    chain.sleep(86400 * 31)
+    chain.mine(1)
+
+    lens = deploy_lens(s.registry, gov)
+    states = read_pool_states(lens, registry_pools(s.registry, lens), page_size=2)
+    assert {state["pool"] for state in states} == {p.address for p in pools}
+
+    # someone who owns none of them sees every eligible pool, and sweeps nothing
+    plans = plan_sweeps(states, user)
+    assert [p["pool"] for p in plans] == [replaced, funded[1]]
+    rows = reconcile(plans, submit_sweeps(plans, user))
+    assert [row["status"] for row in rows] == ["not owner", "not owner"]
+    assert not replaced.isRetired() and not funded[1].isRetired()
+
+    plans = plan_sweeps(states, gov)
+    assert [p["pool"] for p in plans] == [replaced, funded[1]]
+    unclaimed = replaced.earned(user)
+    assert plans[0]["unclaimed"] == unclaimed > 0
+    assert plans[1]["unclaimed"] == 0
+
+    rows = reconcile(plans, submit_sweeps(plans, gov))
+    for row, plan in zip(rows, plans):
+        assert row["status"] == "swept"
+        assert (
+            row["swept"] == plan["balance"] == row["undistributed"] + plan["unclaimed"]
+        )
+    assert replaced.isRetired() and funded[1].isRetired()
+    assert not funded[2].isRetired() and not pools[3].isRetired()
+    assert s.reward.balanceOf(replaced) == s.reward.balanceOf(funded[1]) == 0
+
+    # nothing left to do on a second run
+    assert (
+        plan_sweeps(read_pool_states(lens, registry_pools(s.registry, lens)), gov) == []
+    )
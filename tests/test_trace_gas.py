@@ -0,0 +1,38 @@
+from scripts.trace_gas import (
+    intrinsic_gas,
+    replay_scenario,
+    trace_transaction,
+    write_folded,
+)
+
+
+# steps should account for all but the intrinsic cost, with the hot modifiers showing up by name
+def test_trace_gas(gov, user, tmp_path):
+    txs = replay_scenario(gov, user)
+    assert set(txs) == {
+        "stake",
+        "getReward",
+        "withdraw",
+        "zapIn",
+        "exit",
+        "addStakingPool",
+    }
+
+    stake = trace_transaction(txs["stake"], "stake")
+    # the leftover row absorbs any miscounted step, stake refunds nothing
+    rest = stake["folded"]["stake;[intrinsic and refunds]"]
+    assert rest >= 0
+    assert abs(rest - intrinsic_gas(txs["stake"].input)) < 1_000
+    assert any("updateReward [modifier]" in region for region in stake["regions"])
+    assert any("nonReentrant" in region for region in stake["regions"])
+
+    # staking writes our balance, first touch of each slot is cold
+    stores = [row for row in stake["storage"].values() if "SSTORE cold" in row]
+    assert stores
+
+    zap = trace_transaction(txs["zapIn"], "zapIn")
+    assert any("_checkAllowance" in region for region in zap["regions"])
+
+    path = write_folded(stake, tmp_path)
+    lines = path.read_text().splitlines()
+    assert lines and all(line.startswith("stake") for line in lines)
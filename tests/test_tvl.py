@@ -0,0 +1,134 @@
+import numpy as np
+from brownie import chain
+from scripts.local_system import (
+    deploy_local_system,
+    deploy_pool,
+    fund_rewards,
+    fund_staker,
+)
+from scripts.tvl import (
+    PriceCache,
+    all_pools,
+    deployment_block,
+    pool_tvl,
+    supply_events,
+    supply_series,
+)
+
+
+# tvl rebuilt from events and cached pricePerShare should match the chain
+def test_tvl_matches_pool(
+    local_system, deployer, user, mock_vault, mock_pool, tmp_path
+):
+    start = chain.height
+    fund_staker(local_system, user, 1_000e18, [mock_pool])
+
+    harvests = []
+    for i in range(4):
+        mock_pool.stake(100e18, {"from": user})
+        if i == 2:
+            mock_pool.withdraw(150e18, {"from": user})
+        tx = mock_vault.setPricePerShare(
+            mock_vault.pricePerShare() + 10**16, {"from": deployer}
+        )
+        harvests.append(tx.block_number)
+        chain.mine(3)
+
+    blocks = np.arange(start, chain.height + 1)
+    cache = PriceCache(tmp_path)
+    assert cache.fill(mock_vault, blocks, harvests, max_gap=1) > 0
+    assert cache.fill(mock_vault, blocks, harvests, max_gap=1) == 0
+
+    supply = supply_series(
+        supply_events(mock_pool, start + 1, chain.height),
+        mock_pool.totalSupply(block_identifier=start),
+    )
+    tvl = pool_tvl(supply, cache.get(mock_vault), blocks, 18)
+    for block, value in zip(blocks, tvl):
+        staked = mock_pool.totalSupply(block_identifier=int(block))
+        pps = mock_vault.pricePerShare(block_identifier=int(block))
+        assert np.isclose(value, staked * pps / 1e36)
+
+    # a fresh cache reads the saved series back, nothing left to fetch
+    cache = PriceCache(tmp_path, max_series=1)
+    assert cache.fill(mock_vault, blocks, harvests, max_gap=1) == 0
+
+
+# sparse samples are interpolated, and the whole range is filled in one fetch
+def test_price_cache_interpolates(tmp_path):
+    # prices over 2**63 only fit as offsets from the first sample
+    def price(block):
+        return 10**20 + 10**12 * int(block)
+
+    calls = []
+
+    def fetch(vault, blocks):
+        calls.append(blocks)
+        return [price(b) for b in blocks]
+
+    blocks = np.arange(1_000, 101_000, 97)
+    harvests = [5_000, 50_003]
+    cache = PriceCache(tmp_path, fetch=fetch)
+    fetched = cache.fill("0xvault", blocks, harvests, max_gap=7_200)
+    assert len(calls) == 1 and fetched == len(calls[0]) < 20
+    assert cache.fill("0xvault", blocks, harvests, max_gap=7_200) == 0
+
+    series = cache.get("0xvault")
+    assert series.base == price(calls[0][0])
+    expected = np.array([price(b) for b in blocks], dtype=float)
+    assert np.allclose(series.at(blocks), expected, rtol=1e-12)
+
+    # same values read back from disk
+    loaded = PriceCache(tmp_path, fetch=fetch).get("0xvault")
+    assert loaded.base == series.base
+    assert np.array_equal(loaded.at(blocks), series.at(blocks))
+
+
+# migrated stake leaves one pool's supply and enters the other's
+def test_supply_across_migration(accounts, gov):
+    s = deploy_local_system(gov)
+    old, users = s.pool, accounts[1:4]
+    new = deploy_pool(s, s.vault, True)
+    start = chain.height
+    for user in users:
+        fund_staker(s, user, 100e18, [old])
+        old.stake(50e18, {"from": user})
+    fund_rewards(s, old, 100e18)
+    s.vault.approve(new, 2**256 - 1, {"from": users[0]})
+    new.stake(10e18, {"from": users[0]})
+
+    old.setMigration(new, gov, {"from": gov})
+    new.setMigrationSource(old, {"from": gov})
+    chain.sleep(old.MIGRATION_DELAY())
+    old.migrate(users[:2], {"from": gov})
+    old.withdraw(20e18, {"from": users[2]})
+    old.migrate(users[2:], {"from": gov})
+    new.withdraw(5e18, {"from": users[1]})
+    assert old.totalSupply() == 0 and new.totalSupply() == 135e18
+
+    blocks = np.arange(start, chain.height + 1)
+    for pool in (old, new):
+        supply_blocks, values = supply_series(
+            supply_events(pool, start + 1, chain.height),
+            pool.totalSupply(block_identifier=start),
+        )
+        i = np.searchsorted(supply_blocks, blocks, "right")
+        for block, j in zip(blocks, i):
+            assert values[j] == pool.totalSupply(block_identifier=int(block))
+
+
+# a pool replaced inside the chart window is charted from its deployment block on
+def test_pools_deployed_in_window(gov):
+    s = deploy_local_system(gov)
+    start = chain.height
+    chain.mine(5)
+    new = deploy_pool(s, s.vault, True)
+    deployed = new.tx.block_number
+
+    assert deployment_block(new.address, start) == deployed
+    assert deployment_block(new.address, 0, deployed) == deployed
+    assert deployment_block(s.pool.address, start) == start
+    assert all_pools(s.registry, chain.height) == [
+        (s.vault.address, s.pool.address),
+        (s.vault.address, new.address),
+    ]